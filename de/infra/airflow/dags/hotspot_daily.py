@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta
 from airflow import DAG
-from airflow.operators.python import PythonOperator
+from airflow.operators.python import PythonOperator, ShortCircuitOperator
 import sys
 import os
 import asyncio
@@ -13,8 +13,10 @@ sys.path.insert(0, '/opt/airflow')
 from src.etl.staging_extractor import StagingExtractor
 from src.etl.transformer import HotspotTransformer
 from src.etl.loader import ClickHouseLoader
+from src.etl.incremental import HotspotFingerprintStore
+from src.etl.clients import NASAFIRMSClient
 from src.utils.logging import setup_logging, get_logger
-from src.etl.loader import ClickHouseLoader
+from src.config import settings
 
 
 setup_logging()
@@ -49,8 +51,17 @@ def extract_to_staging(**context):
         try:
             staging_data = await extractor.extract_to_staging(date_str)
 
+            if extractor.skip_reason:
+                logger.info(f"Skipping run for {date_str}: {extractor.skip_reason}")
+                context['task_instance'].xcom_push(key='skip_reason', value=extractor.skip_reason)
+                # The batch is legitimately empty, so the same FIRMS data need not be seen again
+                if extractor.skip_reason != 'firms_unchanged':
+                    await extractor.commit_firms_content_hashes()
+                return None
+
             if not staging_data:
-                logger.warning(f"No staging data extracted for {date_str}")
+                logger.warning(f"No staging data extracted for {date_str}, FIRMS content hashes left uncommitted")
+                context['task_instance'].xcom_push(key='skip_reason', value='no_staging_data')
                 return None
 
             staging_dir = f"/tmp/staging_{date_str}"
@@ -104,11 +115,25 @@ def load_staging_to_clickhouse(**context):
 
                     await loader.load_staging_table(table_name, df)
 
+                    if settings.incremental_ingestion and table_name == 'staging_hotspot':
+                        # Hotspots marked seen are never extracted again, so leave
+                        # them unmarked when enrichment failed and the next run retries
+                        if batch_metadata.get('enrichment_failed'):
+                            logger.warning("Enrichment failed, not marking staged hotspots as seen")
+                        else:
+                            await HotspotFingerprintStore().mark_seen(
+                                pl.read_csv(file_path, infer_schema=False)
+                            )
+
                     tables_loaded.append(f"{table_name}: {len(df)} records")
                     logger.info(f"Successfully loaded {table_name} with {len(df)} records")
                 else:
                     logger.warning(f"Staging file not found: {file_path}")
 
+            await NASAFIRMSClient.store_content_hashes(
+                batch_metadata.get('firms_content_hashes', {})
+            )
+
             logger.info(f"Staging load completed: {tables_loaded}")
             return {
                 'batch_id': batch_metadata['batch_id'],
@@ -182,7 +207,10 @@ def transform_to_hotspot(**context):
                     df = dimensional_data[table_name]
                     if not df.is_empty():
                         logger.info(f"Loading {table_name} with {len(df)} records")
-                        await loader.load_fact_with_staging(table_name, df, date_str)
+                        if settings.incremental_ingestion:
+                            await loader.load_fact_append(table_name, df)
+                        else:
+                            await loader.load_fact_with_staging(table_name, df, date_str)
                         tables_loaded.append(f"{table_name}: {len(df)} records")
 
             logger.info(f"Hotspot transformation completed: {tables_loaded}")
@@ -299,7 +327,7 @@ def cleanup_staging_temp_files(**context):
 
     logger.info(f"Staging cleanup completed: {files_cleaned} directories removed")
 
-extract_to_staging_task = PythonOperator(
+extract_to_staging_task = ShortCircuitOperator(
     task_id='extract_to_staging',
     python_callable=extract_to_staging,
     dag=dag,
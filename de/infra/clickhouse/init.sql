@@ -25,6 +25,7 @@ CREATE TABLE hotspot.staging_weather
     `severe_risk` UInt8 DEFAULT 0,
     `conditions` String DEFAULT '',
     `icon` String DEFAULT '',
+    `weather_bucket_id` String DEFAULT '',
     `weather_id` String MATERIALIZED concat(toString(latitude), ':', toString(longitude), ':', toString(datetime))
 )
 ENGINE = ReplacingMergeTree(ingested_at)
@@ -0,0 +1,2 @@
+-- init.sql only runs on a fresh volume; apply this to existing deployments
+ALTER TABLE hotspot.staging_weather ADD COLUMN IF NOT EXISTS `weather_bucket_id` String DEFAULT '' AFTER `icon`;
@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+import polars as pl
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../"))
+
+from src.config import settings
+from src.etl.loader import ClickHouseLoader, serialize_frame
+from src.etl.schemas import coerce_to_table_schema
+
+FORMATS = ["csv", "arrow", "parquet"]
+
+
+def synthetic_fact_hotspot(rows: int) -> pl.DataFrame:
+    rng = random.Random(42)
+    start = datetime(2025, 9, 1)
+    return pl.DataFrame(
+        {
+            "id": [f"01K{rng.getrandbits(100):023X}"[:26] for _ in range(rows)],
+            "satellite_id": [rng.choice(["N_VIIRS", "N20_VIIRS"]) for _ in range(rows)],
+            "confidence_id": [f"conf_{rng.randint(0, 5)}" for _ in range(rows)],
+            "period_id": [f"period_{rng.randint(0, 30)}" for _ in range(rows)],
+            "location_id": [f"loc_{rng.randint(0, 50_000)}" for _ in range(rows)],
+            "acquired_at": [
+                start + timedelta(minutes=rng.randint(0, 43_200)) for _ in range(rows)
+            ],
+            "frp": [rng.uniform(0.5, 50) for _ in range(rows)],
+            "brightness": [rng.uniform(300, 367) for _ in range(rows)],
+            "bright_t31": [rng.uniform(270, 300) for _ in range(rows)],
+            "bright_ti4": [rng.uniform(300, 367) for _ in range(rows)],
+            "bright_ti5": [rng.uniform(270, 300) for _ in range(rows)],
+            "latitude": [f"{rng.uniform(-11, 6):.5f}" for _ in range(rows)],
+            "longitude": [f"{rng.uniform(95, 141):.5f}" for _ in range(rows)],
+            "scan": [rng.uniform(0.3, 0.8) for _ in range(rows)],
+            "track": [rng.uniform(0.3, 0.8) for _ in range(rows)],
+        }
+    )
+
+
+def encode(df: pl.DataFrame, insert_format: str) -> bytes:
+    if insert_format == "csv":
+        return df.write_csv(include_header=False, quote_style="necessary").encode()
+    return serialize_frame(coerce_to_table_schema(df, "fact_hotspot"), insert_format)
+
+
+async def insert(loader: ClickHouseLoader, table: str, df: pl.DataFrame, fmt: str):
+    if fmt == "csv":
+        await loader.insert_csv_data(table, df)
+    else:
+        await loader.insert_native_data(table, df, fmt)
+
+
+async def run(args):
+    loader = ClickHouseLoader() if args.insert else None
+
+    for rows in args.rows:
+        df = synthetic_fact_hotspot(rows)
+        print(f"{rows} rows")
+
+        for fmt in FORMATS:
+            started_at = time.perf_counter()
+            payload = encode(df, fmt)
+            encode_s = time.perf_counter() - started_at
+            line = (
+                f"  {fmt:>8}: {len(payload) / 1e6:8.2f} MB on the wire, "
+                f"encode {encode_s * 1000:8.1f} ms ({rows / encode_s:,.0f} rows/s)"
+            )
+
+            if loader:
+                table = f"fact_hotspot_staging_bench_{fmt}"
+                await loader.execute_query(f"DROP TABLE IF EXISTS {table}")
+                await loader.execute_query(f"CREATE TABLE {table} AS fact_hotspot")
+                try:
+                    started_at = time.perf_counter()
+                    await insert(loader, table, df, fmt)
+                    insert_s = time.perf_counter() - started_at
+                    line += (
+                        f", insert {insert_s * 1000:8.1f} ms "
+                        f"({rows / insert_s:,.0f} rows/s)"
+                    )
+                finally:
+                    await loader.execute_query(f"DROP TABLE IF EXISTS {table}")
+
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ClickHouse insert format benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument(
+        "--insert",
+        action="store_true",
+        help=f"also insert into a scratch copy of fact_hotspot on "
+        f"{settings.clickhouse_host}:{settings.clickhouse_port}",
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+import polars as pl
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../"))
+
+from src.etl.loader import ClickHouseLoader
+
+TABLE = "dim_location_bench"
+KEY_COLS = ["latitude", "longitude"]
+
+
+def coordinate(n: int) -> tuple:
+    # Grid indices stand in for coordinates; they only need to be unique strings
+    # that ClickHouse and Python render identically
+    return str(n // 46_000), str(n % 46_000)
+
+
+def batch_frame(size: int, table_rows: int) -> pl.DataFrame:
+    # Half of the batch already exists in the table, half is new
+    half = size // 2
+    step = max(table_rows // half, 1)
+    existing = [coordinate(n) for n in range(0, table_rows, step)][:half]
+    new = [coordinate(table_rows + n) for n in range(size - len(existing))]
+    rows = existing + new
+    return pl.DataFrame(
+        {"latitude": [r[0] for r in rows], "longitude": [r[1] for r in rows]}
+    )
+
+
+async def grow_table(loader: ClickHouseLoader, rows: int):
+    current_rows = await loader.get_table_count(TABLE)
+    await loader.execute_query(f"""
+    INSERT INTO {TABLE} (id, latitude, longitude, subdistrict_code)
+    SELECT
+        toString(number),
+        toString(intDiv(number, 46000)),
+        toString(number % 46000),
+        'bench'
+    FROM numbers({current_rows}, {rows - current_rows})
+    """)
+
+
+async def full_scan(loader: ClickHouseLoader, df: pl.DataFrame) -> pl.DataFrame:
+    result = await loader.execute_query(
+        f"SELECT latitude, longitude FROM {TABLE} FORMAT CSVWithNames"
+    )
+    existing_df = pl.read_csv(io.StringIO(result), infer_schema=False)
+    return df.join(existing_df, on=KEY_COLS, how="anti")
+
+
+async def timed(coro_factory, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        result = await coro_factory()
+        timings.append(time.perf_counter() - started_at)
+    return result, min(timings)
+
+
+async def run(args):
+    loader = ClickHouseLoader()
+    await loader.execute_query(f"DROP TABLE IF EXISTS {TABLE}")
+    await loader.execute_query(f"CREATE TABLE {TABLE} AS dim_location")
+
+    try:
+        for table_rows in args.table_rows:
+            await grow_table(loader, table_rows)
+            df = batch_frame(args.batch, table_rows)
+
+            scoped, scoped_s = await timed(
+                lambda: loader._filter_existing(TABLE, df, KEY_COLS), args.repeats
+            )
+            scanned, scan_s = await timed(lambda: full_scan(loader, df), args.repeats)
+            assert scoped.sort(KEY_COLS).equals(scanned.sort(KEY_COLS))
+
+            print(
+                f"{table_rows:>10} rows in {TABLE}, batch {len(df)} "
+                f"({len(scoped)} new) | batch-scoped {scoped_s * 1000:8.1f} ms | "
+                f"full key download {scan_s * 1000:8.1f} ms"
+            )
+    finally:
+        await loader.execute_query(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="dim_location existing-key lookup vs table size (needs ClickHouse)"
+    )
+    parser.add_argument(
+        "--table-rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--batch", type=int, default=1_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
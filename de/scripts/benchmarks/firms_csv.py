@@ -0,0 +1,86 @@
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from io import StringIO
+import polars as pl
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../"))
+
+from src.etl.clients import parse_firms_csv
+
+HEADER = (
+    "latitude,longitude,bright_ti4,scan,track,acq_date,acq_time,satellite,"
+    "instrument,confidence,version,bright_ti5,frp,daynight"
+)
+
+
+def synthetic_firms_csv(rows: int) -> bytes:
+    rng = random.Random(42)
+    lines = [HEADER]
+    for _ in range(rows):
+        lines.append(
+            f"{rng.uniform(-11, 6):.5f},{rng.uniform(95, 141):.5f},"
+            f"{rng.uniform(300, 367):.2f},{rng.uniform(0.3, 0.8):.2f},"
+            f"{rng.uniform(0.3, 0.8):.2f},2025-09-{rng.randint(1, 7):02d},"
+            f"{rng.randint(0, 2359):04d},N,VIIRS,{rng.choice('lnh')},2.0NRT,"
+            f"{rng.uniform(270, 300):.2f},{rng.uniform(0.5, 50):.2f},"
+            f"{rng.choice('DN')}"
+        )
+    return ("\n".join(lines) + "\n").encode()
+
+
+def legacy_parse(body: bytes) -> pl.DataFrame:
+    response_text = body.decode().strip()
+    if "Invalid" in response_text or "Error" in response_text:
+        return pl.DataFrame()
+    lines = response_text.split("\n")
+    if len(lines) <= 1:
+        return pl.DataFrame()
+    df = pl.read_csv(StringIO(response_text))
+    return df.select([pl.col(col).cast(pl.Utf8) for col in df.columns])
+
+
+def measure(parse, body: bytes, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        df = parse(body)
+        timings.append(time.perf_counter() - started_at)
+
+    tracemalloc.start()
+    parse(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, min(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FIRMS CSV ingestion benchmark")
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000, 500_000]
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        body = synthetic_firms_csv(rows)
+        legacy_df, legacy_s, legacy_peak = measure(legacy_parse, body, args.repeats)
+        bytes_df, bytes_s, bytes_peak = measure(parse_firms_csv, body, args.repeats)
+        key_cols = ["latitude", "longitude", "acq_date", "acq_time", "version"]
+        assert legacy_df.select(key_cols).equals(
+            bytes_df.select(key_cols)
+        ), "parsers disagree on staging key columns"
+
+        print(
+            f"{rows:>9} rows ({len(body) / 1e6:.1f} MB) | "
+            f"legacy {legacy_s * 1000:8.1f} ms, python peak {legacy_peak / 1e6:7.1f} MB | "
+            f"bytes {bytes_s * 1000:8.1f} ms, python peak {bytes_peak / 1e6:7.1f} MB | "
+            f"speedup {legacy_s / bytes_s:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
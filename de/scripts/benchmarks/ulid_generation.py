@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+import time
+import polars as pl
+from ulid import ULID
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../"))
+
+from src.utils.ids import generate_ulids
+
+
+def per_row_ulids(count: int) -> pl.Series:
+    return pl.Series("id", [str(ULID()) for _ in range(count)], dtype=pl.Utf8)
+
+
+def measure(generate, count: int, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        ids = generate(count)
+        timings.append(time.perf_counter() - started_at)
+    return ids, min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk ULID generation benchmark")
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        _, per_row_s = measure(per_row_ulids, rows, args.repeats)
+        ids, bulk_s = measure(generate_ulids, rows, args.repeats)
+
+        assert ids.n_unique() == rows and ids.is_sorted()
+        assert all(str(ULID.from_str(value)) == value for value in ids.head(1000))
+
+        print(
+            f"{rows:>9} ids | per-row ULID() {rows / per_row_s:12,.0f} ids/s | "
+            f"generate_ulids {rows / bulk_s:12,.0f} ids/s | "
+            f"speedup {per_row_s / bulk_s:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
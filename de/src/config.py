@@ -17,6 +17,9 @@ class Settings(BaseSettings):
     clickhouse_db: str = "hotspot"
     clickhouse_user: str = "default"
     clickhouse_password: str = ""
+    clickhouse_insert_format: str = "arrow"
+    clickhouse_insert_chunk_rows: int = 100000
+    clickhouse_insert_compression: str = "zstd"
     redis_host: str = "redis"
     redis_port: int = 6379
     redis_db: int = 0
@@ -26,17 +29,37 @@ class Settings(BaseSettings):
     visualcrossing_api_key: Optional[str] = None
     visualcrossing_base_url: str = "https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline"
     visualcrossing_cache_ttl_hours: int = 24
-    visualcrossing_request_delay_seconds: float = 5
+    visualcrossing_rate_limit_requests: int = 600
+    visualcrossing_rate_limit_window: int = 60
+    # Deprecated: still honoured as a cap on visualcrossing_rate_limit_*
+    visualcrossing_request_delay_seconds: Optional[float] = None
+    weather_bucket_degrees: float = 0.0
+    weather_bucket_minutes: int = 60
+    weather_timeline_mode: bool = False
     batch_size: int = 1000
     max_retry_attempts: int = 3
     backfill_chunk_size: int = 7
+    incremental_ingestion: bool = False
+    incremental_fingerprint_ttl_hours: int = 48
+    deterministic_dimension_keys: bool = False
+    transform_streaming: bool = False
+    transform_prefetch_concurrency: int = 4
     etl_schedule_interval: str = "*/15"
     nasa_rate_limit_requests: int = 4500
     nasa_rate_limit_window: int = 600
-    bmkg_batch_size: int = 80
-    bmkg_batch_delay_seconds: float = 5.0
-    bmkg_request_delay_seconds: float = 0.1
+    nasa_max_concurrency: int = 4
+    firms_skip_unchanged: bool = True
+    firms_content_hash_ttl_hours: int = 48
+    bmkg_max_concurrency: int = 10
+    bmkg_rate_limit_requests: int = 60
+    bmkg_rate_limit_window: int = 60
+    # Deprecated: still honoured as a cap on bmkg_rate_limit_*
+    bmkg_request_delay_seconds: Optional[float] = None
     bmkg_cache_ttl_hours: int = 6 
+    bmkg_negative_cache_ttl_hours: int = 24
+    local_geocoder_boundaries_path: Optional[str] = None
+    indonesia_mask_path: Optional[str] = None
+    indonesia_mask_buffer_degrees: float = 0.01
     request_delay_seconds: float = 2.0
     backfill_delay_seconds: float = 5.0
 
@@ -1,43 +1,236 @@
 import asyncio
+import hashlib
+import math
 from datetime import datetime
-from io import StringIO
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
+import httpx
 import polars as pl
 import time
-import json
 from src.config import settings
 from src.utils.logging import get_logger
 from src.utils.connections import redis_manager, http_manager
+from src.utils.cache import BulkCache
+from src.etl.geo import LocalReverseGeocoder
 
 logger = get_logger(__name__)
 
 
-class RateLimiter:
-    def __init__(self, max_requests: int = 4500, time_window: int = 600):
-        self.max_requests = max_requests
-        self.time_window = time_window
-        self.requests = []
+FIRMS_REQUIRED_COLUMNS = ["latitude", "longitude", "acq_date", "acq_time"]
+# Parsed numerically so their text matches the keys already stored in staging
+# and dim_location; every other FIRMS column is kept as the raw string.
+FIRMS_KEY_TYPES = {
+    "latitude": pl.Float64,
+    "longitude": pl.Float64,
+    "acq_time": pl.Int64,
+}
 
-    async def acquire(self):
-        now = time.time()
-        self.requests = [
-            req_time for req_time in self.requests if now - req_time < self.time_window
-        ]
 
-        if len(self.requests) >= self.max_requests:
-            sleep_time = self.time_window - (now - self.requests[0]) + 1
-            logger.warning(f"Rate limit reached, sleeping for {sleep_time:.1f} seconds")
-            await asyncio.sleep(sleep_time)
-            self.requests = []
+def parse_firms_csv(body: bytes) -> pl.DataFrame:
+    header_end = body.find(b"\n")
+    header = body if header_end == -1 else body[:header_end]
+    columns = header.decode("utf-8", errors="replace").strip().split(",")
+
+    missing_cols = [col for col in FIRMS_REQUIRED_COLUMNS if col not in columns]
+    if missing_cols:
+        raise ValueError(f"unexpected response header {header[:200]!r}")
+
+    if header_end == -1 or body.find(b",", header_end) == -1:
+        return pl.DataFrame(schema={col: pl.Utf8 for col in columns})
+
+    df = pl.read_csv(body, infer_schema=False, schema_overrides=FIRMS_KEY_TYPES)
+    return df.with_columns([pl.col(col).cast(pl.Utf8) for col in FIRMS_KEY_TYPES])
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+
+                sleep_time = (1 - self.tokens) / self.rate
+                waited += sleep_time
+                await asyncio.sleep(sleep_time)
+
+
+class LatencyStats:
+    def __init__(self):
+        self.samples: List[float] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.samples)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
 
-        self.requests.append(now)
+    def summary(self) -> Dict[str, float]:
+        if not self.samples:
+            return {"count": 0}
+
+        ordered = sorted(self.samples)
+
+        def percentile(p: float) -> float:
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+        return {
+            "count": len(ordered),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+            "p50_ms": round(percentile(0.50) * 1000, 1),
+            "p95_ms": round(percentile(0.95) * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        }
+
+
+class RedisRateLimiter:
+    # Token bucket kept in a Redis hash so every worker shares one budget per API.
+    # Callers always take a token, possibly going into debt, and sleep until it
+    # matures, which keeps acquire to one round trip and serves callers in order.
+    ACQUIRE_SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate_per_ms = tonumber(ARGV[2])
+    local now_parts = redis.call('TIME')
+    local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+    local tokens = tonumber(state[1]) or capacity
+    local updated_at = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate_per_ms) - 1
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate_per_ms) + 60000)
+    if tokens >= 0 then
+        return 0
+    end
+    return math.ceil(-tokens / rate_per_ms)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_requests: int,
+        time_window: int,
+        burst: int = None,
+        min_interval: Optional[float] = None,
+    ):
+        if min_interval:
+            # Deprecated fixed per-request delays still cap the rate
+            delay_requests = max(1, int(time_window / min_interval))
+            logger.warning(
+                f"The {name} request delay setting is deprecated, use the "
+                f"{name} rate limit settings instead; limiting to "
+                f"{min(max_requests, delay_requests)} requests per {time_window}s"
+            )
+            max_requests = min(max_requests, delay_requests)
+
+        self.key = f"rate_limit:{name}"
+        self.capacity = burst or max_requests
+        self.rate_per_ms = max_requests / (time_window * 1000)
+        self.fallback = TokenBucket(
+            rate=max_requests / time_window, capacity=self.capacity
+        )
+        self.waits = LatencyStats()
+        self._script = None
+        self._use_fallback = False
+
+    async def acquire(self) -> float:
+        if self._use_fallback:
+            waited = await self.fallback.acquire()
+            self.waits.record(waited)
+            return waited
+
+        try:
+            redis_client = await redis_manager.get_client()
+            if self._script is None:
+                self._script = redis_client.register_script(self.ACQUIRE_SCRIPT)
+            wait_ms = await self._script(
+                keys=[self.key], args=[self.capacity, self.rate_per_ms]
+            )
+            waited = int(wait_ms) / 1000
+            if waited > 0:
+                await asyncio.sleep(waited)
+        except Exception as e:
+            logger.warning(
+                f"Shared rate limiter {self.key} unavailable, using local bucket: {e}"
+            )
+            self._use_fallback = True
+            waited = await self.fallback.acquire()
+
+        self.waits.record(waited)
+        return waited
+
+    def summary(self) -> Dict[str, float]:
+        waited = [seconds for seconds in self.waits.samples if seconds > 0]
+        return {
+            "acquired": self.waits.count,
+            "waited": len(waited),
+            "total_wait_s": round(sum(waited), 2),
+            "max_wait_s": round(max(waited), 2) if waited else 0.0,
+        }
 
 
 class NASAFIRMSClient:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self, api_key: Optional[str] = None, content_hash_scope: Optional[str] = None
+    ):
         self.api_key = api_key or settings.nasa_firms_api_key
         self.base_url = settings.nasa_firms_base_url
-        self.rate_limiter = RateLimiter()
+        self.rate_limiter = RedisRateLimiter(
+            "nasa_firms",
+            settings.nasa_rate_limit_requests,
+            settings.nasa_rate_limit_window,
+        )
+        self.content_hash_scope = content_hash_scope
+        self.content_hashes: Dict[str, str] = {}
+        self.changed_sources: Set[str] = set()
+        self.failed_sources: Set[str] = set()
+
+    async def _track_content_hash(self, source: str, day_range: int, body: bytes):
+        key = f"firms_content_hash:{source}:{day_range}"
+        if self.content_hash_scope:
+            key = f"{key}:{self.content_hash_scope}"
+
+        digest = hashlib.sha256(body).hexdigest()
+        self.content_hashes[key] = digest
+
+        try:
+            redis_client = await redis_manager.get_client()
+            previous_digest = await redis_client.get(key)
+        except Exception as e:
+            logger.warning(f"Could not read content hash for {source}: {e}")
+            previous_digest = None
+
+        if previous_digest != digest:
+            self.changed_sources.add(source)
+
+    @staticmethod
+    async def store_content_hashes(content_hashes: Dict[str, str]):
+        if not content_hashes:
+            return
+
+        try:
+            redis_client = await redis_manager.get_client()
+            pipe = redis_client.pipeline(transaction=False)
+            ttl_seconds = settings.firms_content_hash_ttl_hours * 3600
+            for key, digest in content_hashes.items():
+                pipe.setex(key, ttl_seconds, digest)
+            await pipe.execute()
+            logger.info(f"Stored {len(content_hashes)} FIRMS content hashes")
+        except Exception as e:
+            logger.warning(f"Could not store FIRMS content hashes: {e}")
 
     async def get_hotspots(
         self, country: str = "IDN", source: str = "MODIS_NRT", day_range: int = 1
@@ -54,27 +247,19 @@ class NASAFIRMSClient:
             response = await client.get(url)
             response.raise_for_status()
 
-            response_text = response.text.strip()
-
-            if "Invalid" in response_text or "Error" in response_text:
-                logger.error(f"NASA FIRMS API error: {response_text}")
+            try:
+                df = await asyncio.to_thread(parse_firms_csv, response.content)
+            except ValueError as e:
+                logger.error(f"NASA FIRMS API error for {source}: {e}")
+                self.failed_sources.add(source)
                 return pl.DataFrame()
 
-            lines = response_text.split("\n")
-            if len(lines) <= 1:
-                logger.warning(f"No hotspot data for {source} in last {day_range} days")
-                return pl.DataFrame()
-
-            df = pl.read_csv(StringIO(response_text))
+            # Only bodies that parsed as FIRMS data are hashed, so a repeated
+            # error body such as "Invalid MAP_KEY" never reads as unchanged
+            await self._track_content_hash(source, day_range, response.content)
 
             if df.is_empty():
-                logger.warning(f"Empty dataframe for {source}")
-                return pl.DataFrame()
-
-            required_cols = ["latitude", "longitude", "acq_date", "acq_time"]
-            missing_cols = [col for col in required_cols if col not in df.columns]
-            if missing_cols:
-                logger.error(f"Missing required columns for {source}: {missing_cols}")
+                logger.warning(f"No hotspot data for {source} in last {day_range} days")
                 return pl.DataFrame()
 
             logger.info(
@@ -84,9 +269,11 @@ class NASAFIRMSClient:
 
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error fetching hotspots from {source}: {e}")
+            self.failed_sources.add(source)
             return pl.DataFrame()
         except Exception as e:
             logger.error(f"Error fetching hotspots from {source}: {e}")
+            self.failed_sources.add(source)
             return pl.DataFrame()
 
     async def get_hotspots_bulk(
@@ -123,10 +310,19 @@ class NASAFIRMSClient:
 class LocationService:
     def __init__(self):
         self.base_url = settings.bmkg_api_base_url
+        self.rate_limiter = RedisRateLimiter(
+            "bmkg",
+            settings.bmkg_rate_limit_requests,
+            settings.bmkg_rate_limit_window,
+            # BMKG documents a hard per-minute limit, so no burst on top of the
+            # refill; concurrency only hides latency
+            burst=1,
+            min_interval=settings.bmkg_request_delay_seconds,
+        )
 
     async def get_location_by_coordinates(
         self, longitude: float, latitude: float
-    ) -> Dict:
+    ) -> Optional[Dict]:
         url = f"{self.base_url}/df/v1/adm/coord"
         params = {"lat": latitude, "lon": longitude}
 
@@ -153,86 +349,152 @@ class LocationService:
 
         except Exception as e:
             logger.error(f"Error fetching location: {e}")
-            return {}
+            return None
 
     async def get_location_bulk(self, hotspot_records: List[Dict]) -> List[Dict]:
-        redis_client = await redis_manager.get_client()
+        cache = BulkCache(await redis_manager.get_client(), "Geocoding")
 
-        location_data = []
         unique_coords = list(
             dict.fromkeys([(r["longitude"], r["latitude"]) for r in hotspot_records])
         )
         total_coords = len(unique_coords)
-        batch_size = settings.batch_size
 
         logger.info(f"Processing {total_coords} unique coordinates for geocoding")
 
-        processed = 0
-        for batch_start in range(0, total_coords, batch_size):
-            batch_end = min(batch_start + batch_size, total_coords)
-            batch_coords = unique_coords[batch_start:batch_end]
-            batch_api_hits = 0
-
-            for lon, lat in batch_coords:
-                processed += 1
-                api_hit = False
-                try:
-                    geo_cache_key = f"geo_bmkg:{lat}:{lon}"
-                    geo_cached = await redis_client.get(geo_cache_key)
-
-                    if geo_cached:
-                        location = json.loads(geo_cached)
-                    else:
-                        location = await self.get_location_by_coordinates(lon, lat)
-                        api_hit = True
-                        batch_api_hits += 1
-                        if location:
-                            ttl_seconds = settings.bmkg_cache_ttl_hours * 24 * 3600
-                            await redis_client.setex(
-                                geo_cache_key, ttl_seconds, json.dumps(location)
-                            )
+        local_records = []
+        local_geocoder = LocalReverseGeocoder.from_settings()
+        if local_geocoder and unique_coords:
+            resolved_df, unresolved_df = local_geocoder.resolve(
+                pl.DataFrame(
+                    {
+                        "longitude": [str(lon) for lon, _ in unique_coords],
+                        "latitude": [str(lat) for _, lat in unique_coords],
+                    }
+                )
+            )
+            local_records = resolved_df.to_dicts()
+            unique_coords = list(unresolved_df.select(["longitude", "latitude"]).rows())
+            logger.info(
+                f"Falling back to BMKG for {len(unique_coords)} coordinates outside local boundaries"
+            )
 
-                    if location:
-                        location_record = {
-                            "longitude": str(lon),
-                            "latitude": str(lat),
-                            "province_code": location.get("adm1", ""),
-                            "city_code": location.get("adm2", ""),
-                            "district_code": location.get("adm3", ""),
-                            "subdistrict_code": location.get("adm4", ""),
-                            "province_name": location.get("provinsi", ""),
-                            "city_name": location.get("kotkab", ""),
-                            "district_name": location.get("kecamatan", ""),
-                            "subdistrict_name": location.get("desa", ""),
-                        }
-                        location_data.append(location_record)
+        cache_keys = {
+            coord: f"geo_bmkg:{coord[1]}:{coord[0]}" for coord in unique_coords
+        }
+        locations = {}
+        try:
+            cached = await cache.get_many(list(cache_keys.values()))
+            locations = {
+                coord: cached[key] for coord, key in cache_keys.items() if key in cached
+            }
+        except Exception as e:
+            logger.warning(f"Geocoding cache lookup failed, querying BMKG for all: {e}")
 
-                    if processed % 100 == 0:
-                        logger.info(f"Geocoded {processed}/{total_coords} coordinates")
+        negative_hits = sum(1 for location in locations.values() if not location)
+        missing_coords = [coord for coord in unique_coords if coord not in locations]
+        semaphore = asyncio.Semaphore(settings.bmkg_max_concurrency)
+        latency = LatencyStats()
+        processed = 0
+        ttl_seconds = settings.bmkg_cache_ttl_hours * 24 * 3600
+        negative_ttl_seconds = settings.bmkg_negative_cache_ttl_hours * 3600
 
-                    if api_hit:
-                        await asyncio.sleep(settings.bmkg_request_delay_seconds)
+        logger.info(
+            f"Geocoding {len(missing_coords)} uncached coordinates via BMKG "
+            f"({settings.bmkg_max_concurrency} in flight, "
+            f"{settings.bmkg_rate_limit_requests} requests per {settings.bmkg_rate_limit_window}s)"
+        )
 
+        async def geocode(lon, lat) -> Optional[Dict]:
+            nonlocal processed
+            async with semaphore:
+                try:
+                    await self.rate_limiter.acquire()
+                    started_at = time.perf_counter()
+                    location = await self.get_location_by_coordinates(lon, lat)
+                    latency.record(time.perf_counter() - started_at)
                 except Exception as e:
                     logger.error(f"Failed to geocode {lat}, {lon}: {e}")
+                    return None
+                finally:
+                    processed += 1
+                    if processed % 100 == 0:
+                        logger.info(
+                            f"Geocoded {processed}/{len(missing_coords)} coordinates"
+                        )
 
-            if batch_end < total_coords and batch_api_hits > 0:
-                logger.info(
-                    f"Batch Location complete ({batch_api_hits} API hits). Waiting {settings.bmkg_batch_delay_seconds}s..."
-                )
-                await asyncio.sleep(settings.bmkg_batch_delay_seconds)
+                if location is not None:
+                    await cache.add(
+                        cache_keys[(lon, lat)],
+                        location,
+                        ttl_seconds if location else negative_ttl_seconds,
+                    )
+                return location
+
+        try:
+            fetched = await asyncio.gather(
+                *[geocode(lon, lat) for lon, lat in missing_coords]
+            )
+        finally:
+            await cache.flush()
+
+        negative_writes = 0
+        for coord, location in zip(missing_coords, fetched):
+            if location is None:
+                continue
+
+            locations[coord] = location
+            if not location:
+                negative_writes += 1
+
+        location_data = local_records + [
+            self._to_location_record(lon, lat, locations[(lon, lat)])
+            for lon, lat in unique_coords
+            if locations.get((lon, lat))
+        ]
 
+        logger.info(cache.summary())
+        logger.info(
+            f"Geocoding negative cache: {negative_hits} hits, {negative_writes} writes"
+        )
+        if latency.count:
+            logger.info(f"BMKG geocoding latency: {latency.summary()}")
+            logger.info(f"BMKG rate limiter waits: {self.rate_limiter.summary()}")
         logger.info(f"Completed geocoding {len(location_data)} locations")
         return location_data
 
+    @staticmethod
+    def _to_location_record(lon, lat, location: Dict) -> Dict:
+        return {
+            "longitude": str(lon),
+            "latitude": str(lat),
+            "province_code": location.get("adm1", ""),
+            "city_code": location.get("adm2", ""),
+            "district_code": location.get("adm3", ""),
+            "subdistrict_code": location.get("adm4", ""),
+            "province_name": location.get("provinsi", ""),
+            "city_name": location.get("kotkab", ""),
+            "district_name": location.get("kecamatan", ""),
+            "subdistrict_name": location.get("desa", ""),
+        }
+
 
 class WeatherService:
     def __init__(self):
         self.base_url = settings.visualcrossing_base_url
         self.api_key = settings.visualcrossing_api_key
+        self.rate_limiter = RedisRateLimiter(
+            "visualcrossing",
+            settings.visualcrossing_rate_limit_requests,
+            settings.visualcrossing_rate_limit_window,
+            min_interval=settings.visualcrossing_request_delay_seconds,
+        )
 
     async def get_weather_by_coordinates(
-        self, longitude: float, latitude: float, datetime_str: str = None
+        self,
+        longitude: float,
+        latitude: float,
+        datetime_str: str = None,
+        include: str = "current",
     ) -> Dict:
         if not self.api_key:
             raise ValueError("Visual Crossing API key not configured")
@@ -244,7 +506,7 @@ class WeatherService:
 
         params = {
             "key": self.api_key,
-            "include": "current",
+            "include": include,
             "unitGroup": "metric",
             "timezone": "Z",
         }
@@ -259,8 +521,30 @@ class WeatherService:
             logger.error(f"Error fetching weather from Visual Crossing: {e}")
             return {}
 
+    def _weather_request(self, lon, lat, acq_date, acq_time) -> Tuple[str, Tuple]:
+        # Ensure acq_time is zero-padded to 4 digits (HHMM format)
+        time_str = str(acq_time).zfill(4)
+        cell_degrees = settings.weather_bucket_degrees
+
+        if cell_degrees <= 0:
+            # Parse time string to HH:MM format
+            datetime_str = f"{acq_date}T{time_str[0:2]}:{time_str[2:4]}:00"
+            return "", (lon, lat, datetime_str)
+
+        cell_x = math.floor(float(lon) / cell_degrees)
+        cell_y = math.floor(float(lat) / cell_degrees)
+        minute_of_day = int(time_str[0:2]) * 60 + int(time_str[2:4])
+        slot = minute_of_day // settings.weather_bucket_minutes
+        slot_start = slot * settings.weather_bucket_minutes
+
+        bucket_id = f"{cell_degrees}:{cell_y}:{cell_x}:{acq_date}:{slot}"
+        center_lon = round((cell_x + 0.5) * cell_degrees, 6)
+        center_lat = round((cell_y + 0.5) * cell_degrees, 6)
+        datetime_str = f"{acq_date}T{slot_start // 60:02d}:{slot_start % 60:02d}:00"
+        return bucket_id, (center_lon, center_lat, datetime_str)
+
     async def get_weather_bulk(self, hotspot_records: List[Dict]) -> List[Dict]:
-        redis_client = await redis_manager.get_client()
+        cache = BulkCache(await redis_manager.get_client(), "Weather")
 
         weather_data = []
         unique_coords = list(
@@ -271,70 +555,168 @@ class WeatherService:
                 ]
             )
         )
-        total_coords = len(unique_coords)
-        batch_size = settings.batch_size
 
-        logger.info(f"Processing {total_coords} unique weather coordinates")
+        timeline_mode = settings.weather_timeline_mode
+        buckets: Dict[Tuple, List[Tuple]] = {}
+        requests = {}
+        cache_keys = {}
+        for coord in unique_coords:
+            lon, lat, acq_date, acq_time = coord
+            try:
+                bucket_id, request = self._weather_request(lon, lat, acq_date, acq_time)
+            except ValueError as e:
+                logger.error(f"Invalid weather coordinate {lat}, {lon}: {e}")
+                continue
+
+            if timeline_mode:
+                request_lon, request_lat, _ = request
+                request_key = (request_lon, request_lat, acq_date)
+                request = (request_lon, request_lat, str(acq_date))
+                cache_key = f"weather_vc_day:{request_lat}:{request_lon}:{acq_date}"
+            else:
+                request_key = bucket_id or coord
+                cache_key = (
+                    f"weather_vc_cell:{bucket_id}"
+                    if bucket_id
+                    else f"weather_vc:{lat}:{lon}:{acq_date}:{acq_time}"
+                )
 
-        processed = 0
-        for batch_start in range(0, total_coords, batch_size):
-            batch_end = min(batch_start + batch_size, total_coords)
-            batch_coords = unique_coords[batch_start:batch_end]
-            batch_api_hits = 0
+            if request_key not in requests:
+                requests[request_key] = request
+                cache_keys[request_key] = cache_key
+            buckets.setdefault(request_key, []).append((coord, bucket_id))
 
-            for lon, lat, acq_date, acq_time in batch_coords:
-                processed += 1
-                api_hit = False
-                try:
-                    # Ensure acq_time is zero-padded to 4 digits (HHMM format)
-                    time_str = str(acq_time).zfill(4)
+        total_requests = len(requests)
 
-                    # Parse time string to HH:MM format
-                    datetime_str = f"{acq_date}T{time_str[0:2]}:{time_str[2:4]}:00"
+        logger.info(
+            f"Processing {len(unique_coords)} unique weather coordinates "
+            f"as {total_requests} weather requests"
+        )
 
-                    weather_cache_key = f"weather_vc:{lat}:{lon}:{acq_date}:{acq_time}"
-                    weather_cached = await redis_client.get(weather_cache_key)
+        cached = {}
+        try:
+            cached = await cache.get_many(list(cache_keys.values()))
+        except Exception as e:
+            logger.warning(
+                f"Weather cache lookup failed, querying Visual Crossing for all: {e}"
+            )
 
-                    if weather_cached:
-                        weather = json.loads(weather_cached)
-                    else:
+        processed = 0
+        api_hits = 0
+        ttl_seconds = settings.visualcrossing_cache_ttl_hours * 3600
+        try:
+            for request_key, request in requests.items():
+                request_lon, request_lat, datetime_str = request
+                processed += 1
+                try:
+                    weather = cached.get(cache_keys[request_key])
+                    # Entries with no hours were cached before empty timelines
+                    # were kept out of the cache; fetch those again
+                    if (
+                        timeline_mode
+                        and weather is not None
+                        and not weather.get("hours")
+                    ):
+                        weather = None
+
+                    if weather is None:
+                        await self.rate_limiter.acquire()
                         weather = await self.get_weather_by_coordinates(
-                            lon, lat, datetime_str
+                            request_lon,
+                            request_lat,
+                            datetime_str,
+                            include="hours" if timeline_mode else "current",
                         )
-                        api_hit = True
-                        batch_api_hits += 1
-                        if weather:
-                            ttl_seconds = settings.visualcrossing_cache_ttl_hours * 3600
-                            await redis_client.setex(
-                                weather_cache_key, ttl_seconds, json.dumps(weather)
+                        api_hits += 1
+                        if weather and timeline_mode:
+                            days = weather.get("days") or [{}]
+                            weather = {"hours": days[0].get("hours") or []}
+                        # An empty timeline would otherwise hide the whole bucket
+                        # for the full TTL
+                        if weather and (not timeline_mode or weather["hours"]):
+                            await cache.add(
+                                cache_keys[request_key], weather, ttl_seconds
                             )
 
                     if weather:
-                        weather_record = self._extract_weather_data(
-                            weather, lon, lat, acq_date, acq_time
-                        )
-                        weather_data.append(weather_record)
+                        for coord, bucket_id in buckets[request_key]:
+                            lon, lat, acq_date, acq_time = coord
+                            if timeline_mode:
+                                conditions = self._conditions_at(
+                                    weather["hours"], acq_time
+                                )
+                                if not conditions:
+                                    continue
+                                source = {"currentConditions": conditions}
+                            else:
+                                source = weather
+
+                            weather_record = self._extract_weather_data(
+                                source, lon, lat, acq_date, acq_time
+                            )
+                            weather_record["weather_bucket_id"] = bucket_id
+                            weather_data.append(weather_record)
 
                     if processed % 100 == 0:
                         logger.info(
-                            f"Fetched weather for {processed}/{total_coords} coordinates"
+                            f"Fetched weather for {processed}/{total_requests} requests"
                         )
 
-                    if api_hit:
-                        await asyncio.sleep(settings.bmkg_request_delay_seconds)
-
                 except Exception as e:
-                    logger.error(f"Failed to fetch weather for {lat}, {lon}: {e}")
-
-            if batch_end < total_coords and batch_api_hits > 0:
-                logger.info(
-                    f"Batch Weather complete ({batch_api_hits} API hits). Waiting {settings.visualcrossing_request_delay_seconds}s..."
-                )
-                await asyncio.sleep(settings.visualcrossing_request_delay_seconds)
-
+                    logger.error(
+                        f"Failed to fetch weather for {request_lat}, {request_lon}: {e}"
+                    )
+        finally:
+            await cache.flush()
+
+        logger.info(cache.summary())
+        if api_hits:
+            logger.info(
+                f"Visual Crossing rate limiter waits: {self.rate_limiter.summary()}"
+            )
         logger.info(f"Completed fetching {len(weather_data)} weather records")
         return weather_data
 
+    def _conditions_at(self, hours: List[Dict], acq_time: str) -> Dict:
+        hours_by_index = {}
+        for hour in hours:
+            try:
+                hours_by_index[int(str(hour.get("datetime", ""))[0:2])] = hour
+            except ValueError:
+                continue
+
+        if not hours_by_index:
+            return {}
+
+        time_str = str(acq_time).zfill(4)
+        hour_index = int(time_str[0:2])
+        fraction = int(time_str[2:4]) / 60
+
+        base = hours_by_index.get(hour_index)
+        if base is None:
+            nearest = min(hours_by_index, key=lambda index: abs(index - hour_index))
+            return dict(hours_by_index[nearest])
+
+        following = hours_by_index.get(hour_index + 1)
+        if following is None or fraction == 0:
+            return dict(base)
+
+        conditions = dict(base if fraction < 0.5 else following)
+        for field, start in base.items():
+            end = following.get(field)
+            if isinstance(start, bool) or not isinstance(start, (int, float)):
+                continue
+            if isinstance(end, bool) or not isinstance(end, (int, float)):
+                continue
+
+            if field == "winddir":
+                delta = (end - start + 180) % 360 - 180
+                conditions[field] = (start + delta * fraction) % 360
+            elif field != "datetimeEpoch":
+                conditions[field] = start + (end - start) * fraction
+
+        return conditions
+
     def _extract_weather_data(
         self, weather: Dict, lon: float, lat: float, acq_date: str, acq_time: str
     ) -> Dict:
@@ -0,0 +1,174 @@
+import json
+import time
+from typing import Optional, Tuple
+import numpy as np
+import polars as pl
+import shapely
+from shapely.geometry import shape
+from src.config import settings
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+BOUNDARY_PROPERTIES = {
+    "adm1": "province_code",
+    "adm2": "city_code",
+    "adm3": "district_code",
+    "adm4": "subdistrict_code",
+    "provinsi": "province_name",
+    "kotkab": "city_name",
+    "kecamatan": "district_name",
+    "desa": "subdistrict_name",
+}
+
+
+def _coordinate_arrays(coords_df: pl.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    lon = coords_df["longitude"].cast(pl.Float64, strict=False).fill_null(np.nan)
+    lat = coords_df["latitude"].cast(pl.Float64, strict=False).fill_null(np.nan)
+    return lon.to_numpy(), lat.to_numpy()
+
+
+class LocalReverseGeocoder:
+    _instance: Optional["LocalReverseGeocoder"] = None
+    # A failed load is remembered so later batches don't reload and re-log it
+    _load_failed = False
+
+    def __init__(self, boundaries_path: str):
+        started_at = time.perf_counter()
+
+        with open(boundaries_path) as boundaries_file:
+            collection = json.load(boundaries_file)
+
+        geometries = []
+        properties = {column: [] for column in BOUNDARY_PROPERTIES.values()}
+        for feature in collection.get("features", []):
+            props = feature.get("properties") or {}
+            desa = props.get("desa") or ""
+            if not feature.get("geometry") or not props.get("adm4"):
+                continue
+            if desa == "Area Tidak Terdefinisi":
+                continue
+
+            geometries.append(shape(feature["geometry"]))
+            for source_key, column in BOUNDARY_PROPERTIES.items():
+                properties[column].append(str(props.get(source_key) or ""))
+
+        self.tree = shapely.STRtree(geometries)
+        self.properties = pl.DataFrame(
+            properties, schema={column: pl.Utf8 for column in properties}
+        ).with_row_index("polygon_idx")
+
+        logger.info(
+            f"Loaded {len(geometries)} admin boundaries from {boundaries_path} "
+            f"in {time.perf_counter() - started_at:.1f}s"
+        )
+
+    @classmethod
+    def from_settings(cls) -> Optional["LocalReverseGeocoder"]:
+        if not settings.local_geocoder_boundaries_path or cls._load_failed:
+            return None
+
+        if cls._instance is None:
+            try:
+                cls._instance = cls(settings.local_geocoder_boundaries_path)
+            except Exception as e:
+                logger.error(
+                    f"Could not load local geocoder boundaries, using BMKG only: {e}"
+                )
+                cls._load_failed = True
+                return None
+        return cls._instance
+
+    def resolve(self, coords_df: pl.DataFrame) -> Tuple[pl.DataFrame, pl.DataFrame]:
+        coords = (
+            coords_df.select(
+                [pl.col("longitude").cast(pl.Utf8), pl.col("latitude").cast(pl.Utf8)]
+            )
+            .unique(maintain_order=True)
+            .with_row_index("point_idx")
+        )
+        if coords.is_empty():
+            return pl.DataFrame(), coords.drop("point_idx")
+
+        started_at = time.perf_counter()
+        lon, lat = _coordinate_arrays(coords)
+        point_idx, polygon_idx = self.tree.query(
+            shapely.points(lon, lat), predicate="intersects"
+        )
+
+        matches = pl.DataFrame(
+            {
+                "point_idx": pl.Series(point_idx, dtype=pl.UInt32),
+                "polygon_idx": pl.Series(polygon_idx, dtype=pl.UInt32),
+            }
+        ).unique(subset="point_idx", keep="first", maintain_order=True)
+
+        resolved = (
+            coords.join(matches, on="point_idx", how="inner")
+            .join(self.properties, on="polygon_idx", how="inner")
+            .select(["longitude", "latitude"] + list(BOUNDARY_PROPERTIES.values()))
+        )
+        unresolved = coords.join(matches, on="point_idx", how="anti").drop("point_idx")
+
+        logger.info(
+            f"Locally geocoded {len(resolved)}/{len(coords)} coordinates "
+            f"in {(time.perf_counter() - started_at) * 1000:.1f}ms"
+        )
+        return resolved, unresolved
+
+
+class IndonesiaLandMask:
+    _instance: Optional["IndonesiaLandMask"] = None
+    _load_failed = False
+
+    def __init__(self, mask_path: str, buffer_degrees: float = 0.0):
+        with open(mask_path) as mask_file:
+            collection = json.load(mask_file)
+
+        if collection.get("type") == "FeatureCollection":
+            geometries = [
+                shape(feature["geometry"])
+                for feature in collection.get("features", [])
+                if feature.get("geometry")
+            ]
+        elif collection.get("type") == "Feature":
+            geometries = [shape(collection["geometry"])]
+        else:
+            geometries = [shape(collection)]
+
+        self.mask = shapely.union_all(geometries)
+        if buffer_degrees > 0:
+            self.mask = self.mask.buffer(buffer_degrees)
+        shapely.prepare(self.mask)
+
+        logger.info(
+            f"Loaded Indonesia land mask from {mask_path} "
+            f"({len(geometries)} geometries, buffer {buffer_degrees}°)"
+        )
+
+    @classmethod
+    def from_settings(cls) -> Optional["IndonesiaLandMask"]:
+        if not settings.indonesia_mask_path or cls._load_failed:
+            return None
+
+        if cls._instance is None:
+            try:
+                cls._instance = cls(
+                    settings.indonesia_mask_path,
+                    settings.indonesia_mask_buffer_degrees,
+                )
+            except Exception as e:
+                logger.error(
+                    f"Could not load Indonesia land mask, not filtering hotspots: {e}"
+                )
+                cls._load_failed = True
+                return None
+        return cls._instance
+
+    def filter(self, df: pl.DataFrame) -> pl.DataFrame:
+        if df.is_empty():
+            return df
+
+        lon, lat = _coordinate_arrays(df)
+        inside = shapely.contains_xy(self.mask, lon, lat)
+        return df.filter(pl.Series(inside, dtype=pl.Boolean))
@@ -0,0 +1,85 @@
+from typing import Set
+import polars as pl
+from src.config import settings
+from src.utils.logging import get_logger
+from src.utils.connections import redis_manager
+
+logger = get_logger(__name__)
+
+# Same parts, in the same order, as the staging_hotspot.hotspot_id column
+FINGERPRINT_COLUMNS = [
+    "latitude",
+    "longitude",
+    "acq_date",
+    "acq_time",
+    "satellite",
+    "instrument",
+    "version",
+]
+
+
+class HotspotFingerprintStore:
+    def __init__(self, chunk_size: int = 5000):
+        self.key_prefix = "hotspot_fingerprints"
+        self.chunk_size = chunk_size
+        self.ttl_seconds = settings.incremental_fingerprint_ttl_hours * 3600
+
+    @staticmethod
+    def fingerprint_expr() -> pl.Expr:
+        return pl.concat_str(
+            [pl.col(col).cast(pl.Utf8).fill_null("") for col in FINGERPRINT_COLUMNS],
+            separator=":",
+        ).alias("fingerprint")
+
+    def _fingerprints_by_date(self, df: pl.DataFrame):
+        fingerprints = df.select(
+            [pl.col("acq_date").cast(pl.Utf8), self.fingerprint_expr()]
+        ).unique()
+        for (acq_date,), group in fingerprints.group_by("acq_date"):
+            yield f"{self.key_prefix}:{acq_date}", group["fingerprint"].to_list()
+
+    async def filter_new(self, df: pl.DataFrame) -> pl.DataFrame:
+        if df.is_empty():
+            return df
+
+        try:
+            redis_client = await redis_manager.get_client()
+            seen: Set[str] = set()
+
+            for key, members in self._fingerprints_by_date(df):
+                for chunk_start in range(0, len(members), self.chunk_size):
+                    chunk = members[chunk_start : chunk_start + self.chunk_size]
+                    flags = await redis_client.smismember(key, chunk)
+                    seen.update(member for member, flag in zip(chunk, flags) if flag)
+        except Exception as e:
+            logger.warning(
+                f"Could not check hotspot fingerprints, keeping all rows: {e}"
+            )
+            return df
+
+        if not seen:
+            return df
+
+        return df.filter(~self.fingerprint_expr().is_in(list(seen)))
+
+    async def mark_seen(self, df: pl.DataFrame):
+        if df.is_empty():
+            return
+
+        try:
+            redis_client = await redis_manager.get_client()
+            pipe = redis_client.pipeline(transaction=False)
+            marked = 0
+
+            for key, members in self._fingerprints_by_date(df):
+                for chunk_start in range(0, len(members), self.chunk_size):
+                    pipe.sadd(
+                        key, *members[chunk_start : chunk_start + self.chunk_size]
+                    )
+                pipe.expire(key, self.ttl_seconds)
+                marked += len(members)
+
+            await pipe.execute()
+            logger.info(f"Marked {marked} hotspot fingerprints as staged")
+        except Exception as e:
+            logger.warning(f"Could not record hotspot fingerprints: {e}")
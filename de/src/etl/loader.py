@@ -1,17 +1,65 @@
-from typing import Dict
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 import polars as pl
-import tempfile
+import pyarrow as pa
+import io
+import time
+import zlib
 from src.config import settings
+from src.etl.schemas import TABLE_SORT_KEYS, coerce_to_table_schema, table_schema
 from src.utils.logging import get_logger
 from src.utils.connections import http_manager
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 logger = get_logger(__name__)
 
+INSERT_FORMATS = {"arrow": "Arrow", "parquet": "Parquet"}
+
+
+def serialize_frame(df: pl.DataFrame, insert_format: str) -> bytes:
+    if insert_format not in INSERT_FORMATS:
+        raise ValueError(f"Unsupported ClickHouse insert format: {insert_format}")
+
+    buffer = io.BytesIO()
+    if insert_format == "parquet":
+        df.write_parquet(buffer, compression="lz4", statistics=False)
+    else:
+        # Oldest compat level writes plain large_string columns, which
+        # ClickHouse reads, instead of string_view
+        df.write_ipc(
+            buffer, compression="uncompressed", compat_level=pl.CompatLevel.oldest()
+        )
+    return buffer.getvalue()
+
+
+def _compressor(content_encoding: Optional[str]):
+    if content_encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    if content_encoding == "gzip":
+        return zlib.compressobj(3, zlib.DEFLATED, 31)
+    return None
+
 
 class ClickHouseLoader:
     def __init__(self):
         self.base_url = f"http://{settings.clickhouse_host}:{settings.clickhouse_port}"
         self.database = settings.clickhouse_db
+        self.content_encoding = self._resolve_content_encoding()
+
+    @staticmethod
+    def _resolve_content_encoding() -> Optional[str]:
+        encoding = settings.clickhouse_insert_compression.lower()
+        if encoding in ("", "none"):
+            return None
+        if encoding not in ("gzip", "zstd"):
+            raise ValueError(f"Unsupported ClickHouse insert compression: {encoding}")
+        if encoding == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed, compressing inserts with gzip")
+            return "gzip"
+        return encoding
 
     async def execute_query(self, query: str) -> str:
         try:
@@ -25,155 +73,358 @@ class ClickHouseLoader:
             logger.error(f"ClickHouse query error: {e}")
             raise
 
+    async def query_arrow(
+        self, query: str, external_tables: Optional[Dict[str, pl.DataFrame]] = None
+    ) -> pl.DataFrame:
+        params = {"database": self.database, "output_format_arrow_string_as_string": 1}
+        files = None
+        if external_tables:
+            # The request body carries the external tables, so the query moves
+            # to the URL
+            params["query"] = f"{query} FORMAT ArrowStream"
+            files = {}
+            for table_name, df in external_tables.items():
+                table_params, table_file = self._external_table(table_name, df)
+                params.update(table_params)
+                files.update(table_file)
+
+        try:
+            client = http_manager.get_client()
+            response = await client.post(
+                f"{self.base_url}/",
+                content=None if files else f"{query} FORMAT ArrowStream",
+                params=params,
+                files=files,
+            )
+            response.raise_for_status()
+        except Exception as e:
+            logger.error(f"ClickHouse query error: {e}")
+            raise
+
+        if not response.content:
+            return pl.DataFrame()
+
+        table = pa.ipc.open_stream(pa.py_buffer(response.content)).read_all()
+        return pl.from_arrow(table)
+
+    @staticmethod
+    def _external_table(table_name: str, df: pl.DataFrame) -> Tuple[Dict, Dict]:
+        payload = df.select(
+            [pl.col(col).cast(pl.Utf8) for col in df.columns]
+        ).write_csv(include_header=False)
+        structure = ", ".join(f"{col} String" for col in df.columns)
+
+        params = {
+            f"{table_name}_format": "CSV",
+            f"{table_name}_structure": structure,
+        }
+        return params, {table_name: (f"{table_name}.csv", payload.encode())}
+
+    async def execute_query_with_external_table(
+        self, query: str, table_name: str, df: pl.DataFrame
+    ) -> str:
+        table_params, table_file = self._external_table(table_name, df)
+
+        try:
+            client = http_manager.get_client()
+            response = await client.post(
+                f"{self.base_url}/",
+                params={"database": self.database, "query": query, **table_params},
+                files=table_file,
+            )
+            response.raise_for_status()
+            return response.text
+        except Exception as e:
+            logger.error(f"ClickHouse query error: {e}")
+            raise
+
+    async def get_location_mapping(self, coords_df: pl.DataFrame) -> pl.DataFrame:
+        if coords_df.is_empty():
+            return pl.DataFrame()
+
+        query = """
+        SELECT latitude, longitude, id AS location_id
+        FROM dim_location
+        WHERE (latitude, longitude) IN (SELECT latitude, longitude FROM batch_coords)
+        LIMIT 1 BY latitude, longitude
+        """
+        return await self.query_arrow(
+            query,
+            external_tables={
+                "batch_coords": coords_df.select(["latitude", "longitude"]).unique()
+            },
+        )
+
+    async def get_existing_locations(self, coords_df: pl.DataFrame) -> pl.DataFrame:
+        if coords_df.is_empty():
+            return pl.DataFrame()
+
+        query = """
+        SELECT
+            id, latitude, longitude,
+            province_code, province_name, city_code, city_name,
+            district_code, district_name, subdistrict_code, subdistrict_name
+        FROM dim_location
+        WHERE (latitude, longitude) IN (SELECT latitude, longitude FROM batch_coords)
+          AND subdistrict_code != ''
+        LIMIT 1 BY latitude, longitude
+        FORMAT CSVWithNames
+        """
+        result = await self.execute_query_with_external_table(
+            query, "batch_coords", coords_df.select(["latitude", "longitude"])
+        )
+
+        if not result.strip():
+            return pl.DataFrame()
+        return pl.read_csv(io.StringIO(result), infer_schema=False)
+
     async def insert_csv_data(self, table_name: str, df: pl.DataFrame):
         if df.is_empty():
             logger.warning(f"DataFrame is empty, skipping insert to {table_name}")
             return
 
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".csv", delete=False
-        ) as tmp_file:
-            include_header = "staging_" in table_name
-            df.write_csv(
-                tmp_file.name, include_header=include_header, quote_style="necessary"
-            )
+        include_header = "staging_" in table_name
+        payload = df.write_csv(
+            include_header=include_header, quote_style="necessary"
+        ).encode()
+
+        if "fact_hotspot" in table_name:
+            columns = ",".join(df.columns)
+            query = f"INSERT INTO {table_name} ({columns}) FORMAT CSV"
+        elif "staging_" in table_name:
+            query = f"INSERT INTO {table_name} FORMAT CSVWithNames"
+        elif "dim_confidence" in table_name:
+            columns = ",".join(df.columns)
+            query = f"INSERT INTO {table_name} ({columns}) FORMAT CSV"
+        else:
+            query = f"INSERT INTO {table_name} FORMAT CSV"
+
+        await self._post_insert(query, payload)
+
+    async def insert_native_data(
+        self, table_name: str, df: pl.DataFrame, insert_format: str = "arrow"
+    ):
+        if df.is_empty():
+            logger.warning(f"DataFrame is empty, skipping insert to {table_name}")
+            return
 
-            with open(tmp_file.name, "rb") as csv_file:
-                if "fact_hotspot" in table_name:
-                    columns = ",".join(df.columns)
-                    query = f"INSERT INTO {table_name} ({columns}) FORMAT CSV"
-                elif "staging_" in table_name:
-                    query = f"INSERT INTO {table_name} FORMAT CSVWithNames"
-                elif "dim_confidence" in table_name:
-                    columns = ",".join(df.columns)
-                    query = f"INSERT INTO {table_name} ({columns}) FORMAT CSV"
-                else:
-                    query = f"INSERT INTO {table_name} FORMAT CSV"
-
-                client = http_manager.get_client()
-                response = await client.post(
-                    f"{self.base_url}/",
-                    params={"database": self.database, "query": query},
-                    content=csv_file.read(),
-                    headers={"Content-Type": "application/octet-stream"},
-                )
-                if response.status_code != 200:
-                    logger.error(f"ClickHouse error response: {response.text}")
-                response.raise_for_status()
+        typed_df = coerce_to_table_schema(df, table_name)
+        payload = serialize_frame(typed_df, insert_format)
 
-    async def load_dimension_small(self, table_name: str, df: pl.DataFrame):
+        columns = ",".join(typed_df.columns)
+        query = (
+            f"INSERT INTO {table_name} ({columns}) "
+            f"FORMAT {INSERT_FORMATS[insert_format]}"
+        )
+
+        await self._post_insert(query, payload)
+        logger.debug(
+            f"Inserted {len(typed_df)} rows into {table_name} as {insert_format} "
+            f"({len(payload)} bytes)"
+        )
+
+    async def insert_arrow_stream(
+        self, table_name: str, df: pl.DataFrame, chunk_rows: Optional[int] = None
+    ):
         if df.is_empty():
-            logger.warning(f"{table_name} is empty, skipping load")
+            logger.warning(f"DataFrame is empty, skipping insert to {table_name}")
             return
 
-        logger.info(f"Loading {len(df)} records to {table_name} (insert new only)")
+        chunk_rows = chunk_rows or settings.clickhouse_insert_chunk_rows
+        typed_df = coerce_to_table_schema(df, table_name)
+        columns = ",".join(typed_df.columns)
+        query = f"INSERT INTO {table_name} ({columns}) FORMAT ArrowStream"
 
-        try:
-            result = await self.execute_query(f"SELECT id FROM {table_name}")
-            existing_ids = set(result.strip().split("\n")) if result.strip() else set()
+        started_at = time.perf_counter()
+        stats = {"raw_bytes": 0, "sent_bytes": 0}
+        await self._post_insert(
+            query, self._arrow_stream_chunks(table_name, typed_df, chunk_rows, stats)
+        )
+        elapsed = time.perf_counter() - started_at
 
-            original_count = len(df)
+        logger.info(
+            f"Streamed {len(typed_df)} rows into {table_name} in {elapsed:.2f}s "
+            f"({len(typed_df) / elapsed:,.0f} rows/s, {stats['raw_bytes']} bytes raw, "
+            f"{stats['sent_bytes']} bytes sent, "
+            f"encoding {self.content_encoding or 'identity'})"
+        )
 
-            df = df.filter(~pl.col("id").is_in(existing_ids))
+    async def _arrow_stream_chunks(
+        self,
+        table_name: str,
+        df: pl.DataFrame,
+        chunk_rows: int,
+        stats: Dict[str, int],
+    ) -> AsyncIterator[bytes]:
+        # One Arrow IPC stream across all chunks; only the current chunk's
+        # encoded bytes are held in memory at any time
+        sink = io.BytesIO()
+        writer = None
+        compressor = _compressor(self.content_encoding)
+        chunk_count = (len(df) + chunk_rows - 1) // chunk_rows
+
+        for chunk_idx, offset in enumerate(range(0, len(df), chunk_rows), start=1):
+            started_at = time.perf_counter()
+            chunk_table = df.slice(offset, chunk_rows).to_arrow(
+                compat_level=pl.CompatLevel.oldest()
+            )
 
-            if len(df) < original_count:
-                logger.info(
-                    f"Filtered out {original_count - len(df)} existing records from {table_name}"
-                )
+            if writer is None:
+                writer = pa.ipc.new_stream(sink, chunk_table.schema)
+            writer.write_table(chunk_table)
+            if chunk_idx == chunk_count:
+                writer.close()
 
-            if df.is_empty():
-                logger.info(
-                    f"All records already exist in {table_name}, skipping insert"
-                )
-                return
+            raw = sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
 
-        except Exception as e:
-            logger.warning(f"Could not check existing IDs: {e}, proceeding with insert")
+            payload = compressor.compress(raw) if compressor else raw
+            if compressor and chunk_idx == chunk_count:
+                payload += compressor.flush()
 
-        await self.insert_csv_data(table_name, df)
+            stats["raw_bytes"] += len(raw)
+            stats["sent_bytes"] += len(payload)
+            if payload:
+                yield payload
 
-        logger.info(f"Successfully inserted {len(df)} new records to {table_name}")
+            # Measured after the yield so the time includes sending the chunk
+            elapsed = time.perf_counter() - started_at
+            logger.info(
+                f"{table_name} chunk {chunk_idx}/{chunk_count}: "
+                f"{chunk_table.num_rows} rows, {len(raw)} bytes raw, "
+                f"{len(payload)} bytes sent, {elapsed * 1000:.1f} ms "
+                f"({chunk_table.num_rows / elapsed:,.0f} rows/s)"
+            )
 
-    async def load_dimension_upsert(
-        self, table_name: str, df: pl.DataFrame, key_col: str
+    async def insert_dataframe(self, table_name: str, df: pl.DataFrame):
+        insert_format = settings.clickhouse_insert_format.lower()
+
+        if insert_format == "csv" or table_schema(table_name) is None:
+            await self.insert_csv_data(table_name, df)
+        elif insert_format == "arrow":
+            await self.insert_arrow_stream(table_name, df)
+        else:
+            await self.insert_native_data(table_name, df, insert_format)
+
+    async def _post_insert(
+        self, query: str, content: Union[bytes, AsyncIterator[bytes]]
     ):
-        if df.is_empty():
-            logger.warning(f"{table_name} is empty, skipping load")
-            return
+        headers = {"Content-Type": "application/octet-stream"}
+        if self.content_encoding:
+            headers["Content-Encoding"] = self.content_encoding
+            if isinstance(content, bytes):
+                compressor = _compressor(self.content_encoding)
+                content = compressor.compress(content) + compressor.flush()
+
+        client = http_manager.get_client()
+        response = await client.post(
+            f"{self.base_url}/",
+            params={"database": self.database, "query": query},
+            content=content,
+            headers=headers,
+        )
+        if response.status_code != 200:
+            logger.error(f"ClickHouse error response: {response.text}")
+        response.raise_for_status()
+
+    async def _filter_existing(
+        self, table_name: str, df: pl.DataFrame, key_cols: List[str]
+    ) -> pl.DataFrame:
+        # Only the batch's keys go to the server. The leading ORDER BY columns
+        # the frame carries are probed along with them, so the IN can use the
+        # primary index rather than scan the whole key column. Rows with the
+        # same key share those values, so the result is the same.
+        sort_prefix = []
+        for col in TABLE_SORT_KEYS.get(table_name, []):
+            if col not in df.columns:
+                break
+            sort_prefix.append(col)
+        probe_cols = sort_prefix + [col for col in key_cols if col not in sort_prefix]
+
+        probe_list = ", ".join(probe_cols)
+        probe_expr = probe_list if len(probe_cols) == 1 else f"({probe_list})"
+        query = f"""
+        SELECT DISTINCT {probe_list}
+        FROM {table_name}
+        WHERE {probe_expr} IN (SELECT {probe_list} FROM batch_keys)
+        FORMAT CSVWithNames
+        """
+        result = await self.execute_query_with_external_table(
+            query, "batch_keys", df.select(probe_cols).unique()
+        )
 
-        logger.info(
-            f"Loading {len(df)} records to {table_name} (insert new only, skip existing)"
+        if not result.strip():
+            return df
+
+        existing_df = pl.read_csv(io.StringIO(result), infer_schema=False).select(
+            [pl.col(col).cast(df.schema[col]) for col in probe_cols]
         )
+        return df.join(existing_df, on=probe_cols, how="anti")
 
+    async def _load_new_rows(
+        self, table_name: str, df: pl.DataFrame, key_cols: List[str]
+    ) -> pl.DataFrame:
         try:
-            result = await self.execute_query(f"SELECT {key_col} FROM {table_name}")
-            existing_ids = set(result.strip().split("\n")) if result.strip() else set()
-
             original_count = len(df)
-            df = df.filter(~pl.col(key_col).is_in(existing_ids))
+            df = await self._filter_existing(table_name, df, key_cols)
 
             if len(df) < original_count:
                 logger.info(
-                    f"Filtered out {original_count - len(df)} existing records (by {key_col})"
+                    f"Filtered out {original_count - len(df)} existing records from {table_name} (by {key_cols})"
                 )
 
             if df.is_empty():
                 logger.info(
                     f"All records already exist in {table_name}, skipping insert"
                 )
-                return
+                return df
         except Exception as e:
-            logger.warning(f"Could not check existing IDs: {e}, proceeding with insert")
+            logger.warning(
+                f"Could not check existing records: {e}, proceeding with insert"
+            )
 
-        await self.insert_csv_data(table_name, df)
-        logger.info(f"Successfully inserted {len(df)} new records to {table_name}")
+        await self.insert_dataframe(table_name, df)
+        return df
 
-    async def load_dimension_composite_key(
-        self, table_name: str, df: pl.DataFrame, key_cols: list
-    ):
+    async def load_dimension_small(self, table_name: str, df: pl.DataFrame):
         if df.is_empty():
             logger.warning(f"{table_name} is empty, skipping load")
             return
 
-        logger.info(f"Loading {len(df)} records to {table_name} (composite key upsert)")
-
-        try:
-            key_cols_str = ", ".join(key_cols)
-            result = await self.execute_query(
-                f"SELECT {key_cols_str} FROM {table_name} FORMAT CSVWithNames"
-            )
+        logger.info(f"Loading {len(df)} records to {table_name} (insert new only)")
 
-            if result.strip():
-                import io
+        df = await self._load_new_rows(table_name, df, ["id"])
+        if not df.is_empty():
+            logger.info(f"Successfully inserted {len(df)} new records to {table_name}")
 
-                existing_df = pl.read_csv(io.StringIO(result))
+    async def load_dimension_upsert(
+        self, table_name: str, df: pl.DataFrame, key_col: str
+    ):
+        if df.is_empty():
+            logger.warning(f"{table_name} is empty, skipping load")
+            return
 
-                for col in key_cols:
-                    if col in existing_df.columns and col in df.columns:
-                        existing_df = existing_df.with_columns(
-                            pl.col(col).cast(df[col].dtype)
-                        )
+        logger.info(
+            f"Loading {len(df)} records to {table_name} (insert new only, skip existing)"
+        )
 
-                original_count = len(df)
-                df = df.join(existing_df, on=key_cols, how="anti")
+        df = await self._load_new_rows(table_name, df, [key_col])
+        if not df.is_empty():
+            logger.info(f"Successfully inserted {len(df)} new records to {table_name}")
 
-                if len(df) < original_count:
-                    logger.info(
-                        f"Filtered out {original_count - len(df)} existing records (by {key_cols})"
-                    )
+    async def load_dimension_composite_key(
+        self, table_name: str, df: pl.DataFrame, key_cols: list
+    ):
+        if df.is_empty():
+            logger.warning(f"{table_name} is empty, skipping load")
+            return
 
-                if df.is_empty():
-                    logger.info(
-                        f"All records already exist in {table_name}, skipping insert"
-                    )
-                    return
-        except Exception as e:
-            logger.warning(
-                f"Could not check existing records: {e}, proceeding with insert"
-            )
+        logger.info(f"Loading {len(df)} records to {table_name} (composite key upsert)")
 
-        await self.insert_csv_data(table_name, df)
-        logger.info(f"Successfully inserted {len(df)} new records to {table_name}")
+        df = await self._load_new_rows(table_name, df, key_cols)
+        if not df.is_empty():
+            logger.info(f"Successfully inserted {len(df)} new records to {table_name}")
 
     async def load_dimension_insert_only(self, table_name: str, df: pl.DataFrame):
         if df.is_empty():
@@ -185,32 +436,12 @@ class ClickHouseLoader:
         )
 
         if table_name == "dim_period" and "id" in df.columns:
-            try:
-                result = await self.execute_query(f"SELECT id FROM {table_name}")
-                existing_ids = (
-                    set(result.strip().split("\n")) if result.strip() else set()
-                )
-
-                original_count = len(df)
-                df = df.filter(~pl.col("id").is_in(existing_ids))
-
-                if len(df) < original_count:
-                    logger.info(
-                        f"Filtered out {original_count - len(df)} duplicate records (by ID)"
-                    )
+            df = await self._load_new_rows(table_name, df, ["id"])
+        else:
+            await self.insert_dataframe(table_name, df)
 
-                if df.is_empty():
-                    logger.info(
-                        f"All records already exist in {table_name}, skipping insert"
-                    )
-                    return
-            except Exception as e:
-                logger.warning(
-                    f"Could not check existing IDs: {e}, proceeding with insert"
-                )
-
-        await self.insert_csv_data(table_name, df)
-        logger.info(f"Successfully loaded {len(df)} records to {table_name}")
+        if not df.is_empty():
+            logger.info(f"Successfully loaded {len(df)} records to {table_name}")
 
     async def load_fact_with_staging(
         self, table_name: str, df: pl.DataFrame, date_str: str
@@ -225,7 +456,7 @@ class ClickHouseLoader:
 
         try:
             await self.execute_query(f"CREATE TABLE {staging_table} AS {table_name}")
-            await self.insert_csv_data(staging_table, df)
+            await self.insert_dataframe(staging_table, df)
 
             await self.execute_query(f"""
             DELETE FROM {table_name}
@@ -246,11 +477,50 @@ class ClickHouseLoader:
         finally:
             await self.execute_query(f"DROP TABLE IF EXISTS {staging_table}")
 
+    async def load_fact_append(self, table_name: str, df: pl.DataFrame):
+        if df.is_empty():
+            logger.warning(f"{table_name} is empty, skipping load")
+            return
+
+        logger.info(f"Appending {len(df)} records to {table_name} (incremental)")
+        # Fact ids come from the staging natural key in incremental mode, so a
+        # retried load skips the rows it already appended. period_id leads the
+        # ORDER BY and lets the lookup use the primary key.
+        df = await self._load_new_rows(table_name, df, ["period_id", "id"])
+        if not df.is_empty():
+            logger.info(f"Successfully appended {len(df)} records to {table_name}")
+
     async def get_table_count(self, table_name: str) -> int:
         query = f"SELECT count() FROM {table_name}"
         result = await self.execute_query(query)
         return int(result.strip())
 
+    async def _drop_unknown_columns(
+        self, table_name: str, df: pl.DataFrame
+    ) -> pl.DataFrame:
+        # Staging columns added in init.sql are missing on deployments created
+        # before them until the migrations in infra/clickhouse/migrations run
+        try:
+            columns_df = await self.query_arrow(f"""
+            SELECT name
+            FROM system.columns
+            WHERE database = '{self.database}' AND table = '{table_name}'
+            """)
+        except Exception as e:
+            logger.warning(f"Could not read columns of {table_name}: {e}")
+            return df
+
+        if columns_df.is_empty():
+            return df
+
+        table_columns = set(columns_df["name"])
+        unknown_columns = [col for col in df.columns if col not in table_columns]
+        if unknown_columns:
+            logger.warning(
+                f"{table_name} has no columns {unknown_columns}, dropping them from the insert"
+            )
+        return df.drop(unknown_columns)
+
     async def load_staging_table(self, table_name: str, df: pl.DataFrame):
         if df.is_empty():
             logger.warning(f"{table_name} is empty, skipping load")
@@ -258,7 +528,8 @@ class ClickHouseLoader:
 
         logger.info(f"Loading {len(df)} records to {table_name} (staging)")
 
-        await self.insert_csv_data(table_name, df)
+        df = await self._drop_unknown_columns(table_name, df)
+        await self.insert_dataframe(table_name, df)
         logger.info(f"Successfully loaded {len(df)} records to {table_name}")
 
         try:
@@ -0,0 +1,191 @@
+from typing import Dict, List, Optional
+import polars as pl
+
+# Column types of the tables in infra/clickhouse/init.sql, as polars dtypes.
+# MATERIALIZED columns are left out because they cannot be inserted.
+CLICKHOUSE_DATETIME = pl.Datetime("ms", "UTC")
+
+TABLE_SCHEMAS: Dict[str, Dict[str, pl.DataType]] = {
+    "staging_weather": {
+        "batch_id": pl.Utf8,
+        "ingested_at": CLICKHOUSE_DATETIME,
+        "latitude": pl.Utf8,
+        "longitude": pl.Utf8,
+        "datetime": CLICKHOUSE_DATETIME,
+        "temperature": pl.Int16,
+        "feels_like": pl.Float32,
+        "humidity": pl.Float32,
+        "precipitation": pl.Float32,
+        "precip_prob": pl.UInt8,
+        "wind_speed": pl.Float32,
+        "wind_degree": pl.Float32,
+        "wind_gust": pl.Float32,
+        "pressure": pl.UInt16,
+        "visibility": pl.UInt16,
+        "cloud_coverage": pl.UInt8,
+        "solar_radiation": pl.Float32,
+        "solar_energy": pl.Float32,
+        "uv_index": pl.UInt8,
+        "severe_risk": pl.UInt8,
+        "conditions": pl.Utf8,
+        "icon": pl.Utf8,
+        "weather_bucket_id": pl.Utf8,
+    },
+    "staging_hotspot": {
+        "batch_id": pl.Utf8,
+        "ingested_at": CLICKHOUSE_DATETIME,
+        "latitude": pl.Utf8,
+        "longitude": pl.Utf8,
+        "acq_date": pl.Date,
+        "acq_time": pl.Utf8,
+        "satellite": pl.Utf8,
+        "instrument": pl.Utf8,
+        "confidence": pl.Utf8,
+        "version": pl.Utf8,
+        "frp": pl.Float32,
+        "daynight": pl.Utf8,
+        "brightness": pl.Float32,
+        "bright_t31": pl.Float32,
+        "scan": pl.Float32,
+        "track": pl.Float32,
+        "bright_ti4": pl.Float32,
+        "bright_ti5": pl.Float32,
+    },
+    "dim_confidence": {
+        "id": pl.Utf8,
+        "confidence_raw": pl.Utf8,
+        "source_instrument": pl.Utf8,
+        "confidence_class": pl.Utf8,
+        "confidence_numeric": pl.UInt8,
+        "confidence_score": pl.Float32,
+        "description": pl.Utf8,
+    },
+    "dim_location": {
+        "id": pl.Utf8,
+        "latitude": pl.Utf8,
+        "longitude": pl.Utf8,
+        "province_code": pl.Utf8,
+        "province_name": pl.Utf8,
+        "city_code": pl.Utf8,
+        "city_name": pl.Utf8,
+        "district_code": pl.Utf8,
+        "district_name": pl.Utf8,
+        "subdistrict_code": pl.Utf8,
+        "subdistrict_name": pl.Utf8,
+    },
+    "dim_period": {
+        "id": pl.Utf8,
+        "date_value": pl.Date,
+        "year_value": pl.UInt16,
+        "semester_value": pl.UInt8,
+        "quarter_value": pl.UInt8,
+        "month_value": pl.UInt8,
+        "month_name": pl.Utf8,
+        "week_value": pl.UInt8,
+    },
+    "dim_satellite": {
+        "id": pl.Utf8,
+        "satellite_name": pl.Utf8,
+        "instrument": pl.Utf8,
+        "version": pl.Utf8,
+        "spatial_resolution_m": pl.Int32,
+        "temporal_resolution_hours": pl.Int32,
+        "description": pl.Utf8,
+    },
+    "dim_weather_condition": {
+        "id": pl.Utf8,
+        "conditions": pl.Utf8,
+        "icon": pl.Utf8,
+    },
+    "fact_hotspot": {
+        "id": pl.Utf8,
+        "satellite_id": pl.Utf8,
+        "confidence_id": pl.Utf8,
+        "period_id": pl.Utf8,
+        "location_id": pl.Utf8,
+        "acquired_at": CLICKHOUSE_DATETIME,
+        "frp": pl.Float32,
+        "brightness": pl.Float32,
+        "latitude": pl.Utf8,
+        "longitude": pl.Utf8,
+        "scan": pl.Float32,
+        "track": pl.Float32,
+        "bright_t31": pl.Float32,
+        "bright_ti4": pl.Float32,
+        "bright_ti5": pl.Float32,
+    },
+    "fact_weather": {
+        "id": pl.Utf8,
+        "period_id": pl.Utf8,
+        "location_id": pl.Utf8,
+        "weather_condition_id": pl.Utf8,
+        "acquired_at": CLICKHOUSE_DATETIME,
+        "temperature": pl.Int16,
+        "humidity": pl.Float32,
+        "wind_speed": pl.Float32,
+        "wind_degree": pl.Float32,
+        "visibility": pl.UInt16,
+        "cloud_coverage": pl.UInt8,
+        "latitude": pl.Utf8,
+        "longitude": pl.Utf8,
+        "pressure": pl.UInt16,
+        "uv_index": pl.UInt8,
+        "precipitation": pl.Float32,
+        "solar_radiation": pl.Float32,
+    },
+}
+
+# ORDER BY columns of the tables in infra/clickhouse/init.sql
+TABLE_SORT_KEYS: Dict[str, List[str]] = {
+    "dim_confidence": ["source_instrument", "confidence_raw"],
+    "dim_location": ["latitude", "longitude"],
+    "dim_period": ["id"],
+    "dim_satellite": ["id"],
+    "dim_weather_condition": ["id"],
+    "fact_hotspot": ["period_id", "location_id", "satellite_id"],
+    "fact_weather": ["period_id", "location_id", "weather_condition_id"],
+}
+
+
+def table_schema(table_name: str) -> Optional[Dict[str, pl.DataType]]:
+    # Daily fact copies (fact_hotspot_staging_20250101) share their base schema
+    return TABLE_SCHEMAS.get(table_name.split("_staging_")[0])
+
+
+def _coerce_column(name: str, source: pl.DataType, target: pl.DataType) -> pl.Expr:
+    col = pl.col(name)
+
+    if target == CLICKHOUSE_DATETIME:
+        if source == pl.Utf8:
+            col = col.str.to_datetime(time_unit="ms", strict=False)
+        elif source == pl.Date:
+            col = col.cast(pl.Datetime("ms"))
+        if isinstance(source, pl.Datetime) and source.time_zone:
+            return col.dt.convert_time_zone("UTC").dt.cast_time_unit("ms").alias(name)
+        return (
+            col.cast(pl.Datetime("ms"), strict=False)
+            .dt.replace_time_zone("UTC")
+            .alias(name)
+        )
+
+    if target == pl.Date and source == pl.Utf8:
+        return col.str.slice(0, 10).str.to_date("%Y-%m-%d", strict=False).alias(name)
+
+    if target.is_integer() and not source.is_integer():
+        col = col.cast(pl.Float64, strict=False).round()
+
+    return col.cast(target, strict=False).alias(name)
+
+
+def coerce_to_table_schema(df: pl.DataFrame, table_name: str) -> pl.DataFrame:
+    schema = table_schema(table_name)
+    if schema is None:
+        raise ValueError(f"No column types known for table {table_name}")
+
+    return df.select(
+        [
+            _coerce_column(name, df.schema[name], schema[name])
+            for name in df.columns
+            if name in schema
+        ]
+    )
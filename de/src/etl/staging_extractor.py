@@ -2,10 +2,14 @@ import polars as pl
 from datetime import datetime
 import pytz
 import asyncio
-from typing import Dict, Optional
+import time
+from typing import Any, Dict, Optional
 from ulid import ULID
 from src.etl.clients import NASAFIRMSClient, LocationService, WeatherService
 from src.etl.loader import ClickHouseLoader
+from src.etl.geo import IndonesiaLandMask
+from src.etl.incremental import HotspotFingerprintStore
+from src.utils.ids import deterministic_id_expr, generate_ulids
 from src.utils.logging import get_logger
 from src.config import settings
 
@@ -16,6 +20,13 @@ class StagingExtractor:
     def __init__(self):
         self.batch_id = str(ULID())
         self.ingested_at = datetime.now(pytz.UTC)
+        self.metrics: Dict[str, int] = {}
+        # skip_reason is only set when the batch is legitimately empty, so the
+        # FIRMS content hashes can be committed. enrichment_failed keeps them
+        # uncommitted so the next run processes the same FIRMS data again.
+        self.skip_reason: Optional[str] = None
+        self.enrichment_failed = False
+        self.firms_content_hashes: Dict[str, str] = {}
 
     async def extract_to_staging(self, date_str: str) -> Dict[str, pl.DataFrame]:
         logger.info(
@@ -28,7 +39,27 @@ class StagingExtractor:
         staging_data = {}
 
         hotspot_df = await self._extract_raw_hotspot_data(date_str, query_date_str)
+        if (
+            hotspot_df is not None
+            and hotspot_df.is_empty()
+            and not self.metrics.get("firms_sources_failed")
+        ):
+            self.skip_reason = "no_firms_hotspots"
+
         if hotspot_df is not None and not hotspot_df.is_empty():
+            hotspot_df = self._apply_land_mask(hotspot_df)
+            if hotspot_df.is_empty():
+                logger.warning("No hotspots inside the Indonesia land mask")
+                self.skip_reason = "outside_land_mask"
+                return staging_data
+
+            if settings.incremental_ingestion:
+                hotspot_df = await self._skip_already_staged(hotspot_df)
+                if hotspot_df.is_empty():
+                    logger.info("No new hotspots since the previous run")
+                    self.skip_reason = "already_staged"
+                    return staging_data
+
             location_df, weather_df = await asyncio.gather(
                 self._extract_and_load_location_data(hotspot_df),
                 self._extract_raw_weather_data(hotspot_df),
@@ -64,6 +95,7 @@ class StagingExtractor:
 
                 if hotspot_df.is_empty():
                     logger.warning("No hotspots with valid Indonesia coordinates")
+                    self.skip_reason = "no_valid_coordinates"
                     return staging_data
 
                 staging_data["staging_hotspot"] = self._prepare_staging_hotspot(
@@ -73,7 +105,9 @@ class StagingExtractor:
                     f"Prepared {len(staging_data['staging_hotspot'])} records for staging_hotspot"
                 )
 
-                if weather_df is not None and not weather_df.is_empty():
+                if weather_df is None or weather_df.is_empty():
+                    self.enrichment_failed = True
+                else:
                     original_weather_count = len(weather_df)
                     weather_df = weather_df.join(
                         location_df.select(["latitude", "longitude"]),
@@ -102,6 +136,7 @@ class StagingExtractor:
                 logger.warning(
                     "No valid location data retrieved, skipping staging preparation"
                 )
+                self.enrichment_failed = True
 
         return staging_data
 
@@ -111,7 +146,9 @@ class StagingExtractor:
         if query_date_str is None:
             query_date_str = date_str
 
-        client = NASAFIRMSClient(api_key=settings.nasa_firms_api_key)
+        client = NASAFIRMSClient(
+            api_key=settings.nasa_firms_api_key, content_hash_scope=query_date_str
+        )
 
         try:
             sources = [
@@ -124,20 +161,57 @@ class StagingExtractor:
                 "VIIRS_SNPP_SP",
             ]
 
-            all_dfs = []
-            for source in sources:
-                try:
-                    df = await client.get_hotspots(
-                        country="IDN", source=source, day_range=1
+            semaphore = asyncio.Semaphore(settings.nasa_max_concurrency)
+            source_timings: Dict[str, float] = {}
+
+            async def fetch_source(source: str) -> Optional[pl.DataFrame]:
+                async with semaphore:
+                    started_at = time.perf_counter()
+                    try:
+                        df = await client.get_hotspots(
+                            country="IDN", source=source, day_range=1
+                        )
+                    except Exception as e:
+                        logger.warning(f"Failed to fetch {source}: {e}")
+                        client.failed_sources.add(source)
+                        return None
+                    finally:
+                        source_timings[source] = round(
+                            time.perf_counter() - started_at, 3
+                        )
+
+                    if df.is_empty():
+                        return None
+
+                    logger.info(
+                        f"Extracted {len(df)} records from {source} "
+                        f"in {source_timings[source]:.2f}s"
                     )
-                    if not df.is_empty():
-                        df = df.with_columns(pl.lit(source).alias("source_api"))
+                    return df.with_columns(pl.lit(source).alias("source_api"))
 
-                        all_dfs.append(df)
-                        logger.info(f"Extracted {len(df)} records from {source}")
-                except Exception as e:
-                    logger.warning(f"Failed to fetch {source}: {e}")
-                    continue
+            results = await asyncio.gather(
+                *[fetch_source(source) for source in sources]
+            )
+            all_dfs = [df for df in results if df is not None]
+
+            logger.info(f"FIRMS fetch timings per source (s): {source_timings}")
+            logger.info(f"FIRMS rate limiter waits: {client.rate_limiter.summary()}")
+
+            self.firms_content_hashes = client.content_hashes
+            self.metrics["firms_sources_changed"] = len(client.changed_sources)
+            self.metrics["firms_sources_failed"] = len(client.failed_sources)
+            # A failed source was never compared, so it may well have changed
+            if (
+                settings.firms_skip_unchanged
+                and client.content_hashes
+                and not client.changed_sources
+                and not client.failed_sources
+            ):
+                self.skip_reason = "firms_unchanged"
+                logger.info(
+                    "No FIRMS source changed since the last processed run, skipping"
+                )
+                return None
 
             if all_dfs:
                 normalized_dfs = []
@@ -188,12 +262,42 @@ class StagingExtractor:
                 return combined_df
             else:
                 logger.warning(f"No hotspot data found for {date_str}")
+                if not client.failed_sources:
+                    self.skip_reason = "no_firms_hotspots"
                 return None
 
         except Exception as e:
             logger.error(f"Error extracting hotspot data: {e}")
             return None
 
+    def _apply_land_mask(self, hotspot_df: pl.DataFrame) -> pl.DataFrame:
+        land_mask = IndonesiaLandMask.from_settings()
+        if land_mask is None:
+            return hotspot_df
+
+        original_count = len(hotspot_df)
+        hotspot_df = land_mask.filter(hotspot_df)
+        outside_count = original_count - len(hotspot_df)
+
+        self.metrics["hotspots_outside_land_mask"] = outside_count
+        logger.info(
+            f"Land mask kept {len(hotspot_df)}/{original_count} hotspots, "
+            f"dropped {outside_count} outside Indonesia before enrichment"
+        )
+        return hotspot_df
+
+    async def _skip_already_staged(self, hotspot_df: pl.DataFrame) -> pl.DataFrame:
+        original_count = len(hotspot_df)
+        hotspot_df = await HotspotFingerprintStore().filter_new(hotspot_df)
+        skipped_count = original_count - len(hotspot_df)
+
+        self.metrics["hotspots_already_staged"] = skipped_count
+        logger.info(
+            f"Incremental mode: {len(hotspot_df)} new hotspots, "
+            f"{skipped_count} already staged by earlier runs"
+        )
+        return hotspot_df
+
     async def _extract_and_load_location_data(
         self, hotspot_df: pl.DataFrame
     ) -> Optional[pl.DataFrame]:
@@ -202,11 +306,34 @@ class StagingExtractor:
 
         try:
             unique_coords = hotspot_df.select(["latitude", "longitude"]).unique()
+
+            existing_df = pl.DataFrame()
+            try:
+                existing_df = await loader.get_existing_locations(unique_coords)
+            except Exception as e:
+                logger.warning(f"Could not look up coordinates in dim_location: {e}")
+
+            self.metrics["geocode_calls_avoided"] = len(existing_df)
+            if not existing_df.is_empty():
+                unique_coords = unique_coords.join(
+                    existing_df.select(["latitude", "longitude"]),
+                    on=["latitude", "longitude"],
+                    how="anti",
+                )
+                logger.info(
+                    f"Resolved {len(existing_df)} coordinates from dim_location, "
+                    f"{len(unique_coords)} left to geocode"
+                )
+
             coord_records = unique_coords.to_dicts()
 
             logger.info(f"Geocoding {len(coord_records)} unique coordinates")
 
-            location_data = await location_service.get_location_bulk(coord_records)
+            location_data = (
+                await location_service.get_location_bulk(coord_records)
+                if coord_records
+                else []
+            )
 
             if location_data:
                 location_df = pl.DataFrame(location_data)
@@ -215,10 +342,14 @@ class StagingExtractor:
                     [pl.lit(None).cast(pl.Utf8).alias("id")]
                 )
 
-                location_ids = [str(ULID()) for _ in range(len(location_df))]
-                location_df = location_df.with_columns(
-                    [pl.Series("id", location_ids, dtype=pl.Utf8)]
-                ).select(
+                if settings.deterministic_dimension_keys:
+                    id_column = deterministic_id_expr(
+                        "dim_location", ["latitude", "longitude"]
+                    ).alias("id")
+                else:
+                    id_column = generate_ulids(len(location_df))
+
+                location_df = location_df.with_columns([id_column]).select(
                     [
                         "id",
                         "latitude",
@@ -240,7 +371,15 @@ class StagingExtractor:
                 logger.info(
                     f"Loaded {len(location_df)} location records to dim_location"
                 )
+
+                if not existing_df.is_empty():
+                    location_df = pl.concat(
+                        [existing_df.select(location_df.columns), location_df],
+                        how="vertical",
+                    )
                 return location_df
+            elif not existing_df.is_empty():
+                return existing_df
             else:
                 logger.warning("No location data retrieved")
                 return None
@@ -423,6 +562,7 @@ class StagingExtractor:
             "severe_risk",
             "conditions",
             "icon",
+            "weather_bucket_id",
         ]
 
         available_staging_columns = [
@@ -433,10 +573,24 @@ class StagingExtractor:
         logger.info(f"Prepared staging_weather with columns: {staging_df.columns}")
         return staging_df
 
-    def get_batch_metadata(self) -> Dict[str, str]:
+    def get_batch_metadata(self) -> Dict[str, Any]:
         return {
             "batch_id": self.batch_id,
             "ingested_at": self.ingested_at.isoformat(),
             "extraction_type": "staging_only",
             "status": "extracted",
+            "metrics": self.metrics,
+            "enrichment_failed": self.enrichment_failed,
+            "firms_content_hashes": (
+                {} if self.enrichment_failed else self.firms_content_hashes
+            ),
         }
+
+    async def commit_firms_content_hashes(self):
+        if self.enrichment_failed:
+            logger.warning(
+                "Enrichment failed, leaving FIRMS content hashes uncommitted for a retry"
+            )
+            return
+
+        await NASAFIRMSClient.store_content_hashes(self.firms_content_hashes)
@@ -1,153 +1,198 @@
+import asyncio
+import time
 import polars as pl
-from typing import Dict
+from typing import Any, Awaitable, Dict, List
 import pytz
-import io
-from ulid import ULID
+from src.config import settings
+from src.utils.ids import deterministic_id_expr, generate_ulids
 from src.utils.logging import get_logger
 from src.etl.loader import ClickHouseLoader
+from src.etl.schemas import TABLE_SCHEMAS
 
 logger = get_logger(__name__)
 
+# Only the staging columns the transformation uses. Date is cast to Date32
+# because ClickHouse sends plain Date as UInt16 day numbers in Arrow.
+STAGING_HOTSPOT_COLUMNS = [
+    "latitude",
+    "longitude",
+    "toDate32(acq_date) AS acq_date",
+    "acq_time",
+    "satellite",
+    "instrument",
+    "confidence",
+    "version",
+    "frp",
+    "brightness",
+    "bright_t31",
+    "scan",
+    "track",
+    "bright_ti4",
+    "bright_ti5",
+]
+
+STAGING_WEATHER_COLUMNS = [
+    "latitude",
+    "longitude",
+    "datetime",
+    "temperature",
+    "humidity",
+    "precipitation",
+    "wind_speed",
+    "wind_degree",
+    "pressure",
+    "visibility",
+    "cloud_coverage",
+    "solar_radiation",
+    "uv_index",
+    "conditions",
+    "icon",
+]
+
+
+LOCATION_MAPPING_SCHEMA = {
+    "latitude": pl.Utf8,
+    "longitude": pl.Utf8,
+    "location_id": pl.Utf8,
+}
+
+# Staging natural keys of the facts. Incremental runs derive fact ids from
+# them, so a retried load produces the same ids and skips rows already written.
+FACT_NATURAL_KEYS = {
+    "fact_hotspot": [
+        "latitude",
+        "longitude",
+        "acquired_at",
+        "satellite",
+        "instrument",
+        "version",
+    ],
+    "fact_weather": ["latitude", "longitude", "acquired_at"],
+}
+
+# Natural key columns of each dimension, as used by the mapping frames
+MAPPING_KEYS = {
+    "dim_confidence": ["confidence", "instrument"],
+    "dim_period": ["date_value"],
+    "dim_weather_condition": ["conditions"],
+}
+
 
 class IDMappings:
     def __init__(self):
-        self.location_map = {}
-        self.confidence_map = {}
-        self.time_map = {}
-        self.weather_condition_map = {}
+        self.mappings: Dict[str, pl.DataFrame] = {
+            namespace: pl.DataFrame(schema={col: pl.Utf8 for col in key_cols + ["id"]})
+            for namespace, key_cols in MAPPING_KEYS.items()
+        }
         self.loader = None
+        self.deterministic = settings.deterministic_dimension_keys
 
-    async def load_existing_locations(self):
+    def _add_known(self, namespace: str, known_df: pl.DataFrame):
+        key_cols = MAPPING_KEYS[namespace]
+        self.mappings[namespace] = pl.concat(
+            [
+                self.mappings[namespace],
+                known_df.select(
+                    [pl.col(col).cast(pl.Utf8) for col in key_cols + ["id"]]
+                ),
+            ]
+        ).unique(subset=key_cols, keep="last", maintain_order=True)
+
+    async def _load_existing(self, namespace: str, query: str):
         if not self.loader:
             return
 
         try:
-            query = """
-            SELECT subdistrict_code, id
-            FROM dim_location
-            WHERE subdistrict_code != ''
-            """
-            result = await self.loader.execute_query(query)
-
-            if result.strip():
-                for line in result.strip().split("\n"):
-                    parts = line.split("\t")
-                    if len(parts) >= 2:
-                        subdistrict_code, location_id = (
-                            parts[0].strip(),
-                            parts[1].strip(),
-                        )
-                        self.location_map[subdistrict_code] = location_id
-
-            logger.info(f"Loaded {len(self.location_map)} existing locations for reuse")
+            existing_df = await self.loader.query_arrow(query)
+            if not existing_df.is_empty():
+                self._add_known(namespace, existing_df)
+
+            logger.info(
+                f"Loaded {len(self.mappings[namespace])} existing {namespace} keys for reuse"
+            )
         except Exception as e:
-            logger.warning(f"Could not load existing locations: {e}")
+            logger.warning(f"Could not load existing {namespace} keys: {e}")
 
     async def load_existing_weather_conditions(self):
-        if not self.loader:
-            return
-
-        try:
-            query = """
+        await self._load_existing(
+            "dim_weather_condition",
+            """
             SELECT conditions, id
             FROM dim_weather_condition
             WHERE conditions != ''
-            """
-            result = await self.loader.execute_query(query)
-
-            if result.strip():
-                for line in result.strip().split("\n"):
-                    parts = line.split("\t")
-                    if len(parts) >= 2:
-                        conditions, weather_id = parts[0].strip(), parts[1].strip()
-                        self.weather_condition_map[conditions] = weather_id
-
-            logger.info(
-                f"Loaded {len(self.weather_condition_map)} existing weather conditions for reuse"
-            )
-        except Exception as e:
-            logger.warning(f"Could not load existing weather conditions: {e}")
+            """,
+        )
 
     async def load_existing_confidence(self):
-        if not self.loader:
-            return
+        await self._load_existing(
+            "dim_confidence",
+            """
+            SELECT confidence_raw AS confidence, source_instrument AS instrument, id
+            FROM dim_confidence
+            """,
+        )
 
-        try:
+    async def resolve_periods(self, dates_df: pl.DataFrame) -> pl.DataFrame:
+        # Existing period ids for every batch date come back in one round trip;
+        # dates already in the mapping frame are not asked for again
+        dates_df = dates_df.select(pl.col("date_value").cast(pl.Utf8)).unique()
+        unknown_dates = dates_df.join(
+            self.mappings["dim_period"], on="date_value", how="anti"
+        )
+
+        if self.loader and not self.deterministic and not unknown_dates.is_empty():
             query = """
-            SELECT confidence_raw, source_instrument, id
-            FROM dim_confidence
+            SELECT toString(date_value) AS date_value, id
+            FROM dim_period
+            WHERE date_value IN (SELECT toDate(date_value) FROM batch_dates)
+            LIMIT 1 BY date_value
             """
-            result = await self.loader.execute_query(query)
-
-            if result.strip():
-                for line in result.strip().split("\n"):
-                    parts = line.split("\t")
-                    if len(parts) >= 3:
-                        confidence_raw = parts[0].strip()
-                        source_instrument = parts[1].strip()
-                        confidence_id = parts[2].strip()
-                        key = f"{confidence_raw}_{source_instrument}"
-                        self.confidence_map[key] = confidence_id
+            try:
+                existing_df = await self.loader.query_arrow(
+                    query, external_tables={"batch_dates": unknown_dates}
+                )
+                if not existing_df.is_empty():
+                    self._add_known("dim_period", existing_df)
 
-            logger.info(
-                f"Loaded {len(self.confidence_map)} existing confidence levels for reuse"
-            )
-        except Exception as e:
-            logger.warning(f"Could not load existing confidence: {e}")
+                logger.info(
+                    f"Found {len(existing_df)}/{len(unknown_dates)} batch dates in dim_period"
+                )
+            except Exception as e:
+                logger.warning(f"Could not check existing periods: {e}")
 
-    async def get_period_id_for_date(self, date_value: str) -> str:
-        if not self.loader:
-            if date_value not in self.time_map:
-                self.time_map[date_value] = str(ULID())
-            return self.time_map[date_value]
+        return self.resolve("dim_period", dates_df)
 
-        try:
-            query = f"""
-            SELECT id
-            FROM dim_period
-            WHERE date_value = '{date_value}'
-            LIMIT 1
-            """
-            result = await self.loader.execute_query(query)
+    def resolve(self, namespace: str, keys_df: pl.DataFrame) -> pl.DataFrame:
+        key_cols = MAPPING_KEYS[namespace]
+        keys_df = keys_df.select(
+            [pl.col(col).cast(pl.Utf8) for col in key_cols]
+        ).unique()
 
-            if result.strip():
-                period_id = result.strip()
-                self.time_map[date_value] = period_id
-                return period_id
-            else:
-                if date_value not in self.time_map:
-                    self.time_map[date_value] = str(ULID())
-                return self.time_map[date_value]
+        if self.deterministic:
+            return keys_df.with_columns(
+                deterministic_id_expr(namespace, key_cols).alias("id")
+            )
 
-        except Exception as e:
-            logger.warning(f"Could not check existing period for {date_value}: {e}")
-            if date_value not in self.time_map:
-                self.time_map[date_value] = str(ULID())
-            return self.time_map[date_value]
-
-    def get_location_id(self, subdistrict_code: str) -> str:
-        key = subdistrict_code
-        if key not in self.location_map:
-            self.location_map[key] = str(ULID())
-        return self.location_map[key]
-
-    def get_confidence_id(self, confidence: str, instrument: str) -> str:
-        key = f"{confidence}_{instrument}"
-        if key not in self.confidence_map:
-            self.confidence_map[key] = str(ULID())
-        return self.confidence_map[key]
-
-    def get_time_id(self, timestamp_str: str) -> str:
-        key = timestamp_str
-        if key not in self.time_map:
-            self.time_map[key] = str(ULID())
-        return self.time_map[key]
-
-    def get_weather_condition_id(self, conditions: str) -> str:
-        key = conditions
-        if key not in self.weather_condition_map:
-            self.weather_condition_map[key] = str(ULID())
-        return self.weather_condition_map[key]
+        missing = keys_df.join(
+            self.mappings[namespace], on=key_cols, how="anti", nulls_equal=True
+        )
+        if not missing.is_empty():
+            self._add_known(
+                namespace, missing.with_columns(generate_ulids(len(missing)))
+            )
+
+        return keys_df.join(
+            self.mappings[namespace], on=key_cols, how="left", nulls_equal=True
+        )
+
+    def join_ids(
+        self, df: pl.DataFrame, namespace: str, id_column: str
+    ) -> pl.DataFrame:
+        key_cols = MAPPING_KEYS[namespace]
+        ids = self.resolve(namespace, df.select(key_cols)).rename({"id": id_column})
+        return df.with_columns([pl.col(col).cast(pl.Utf8) for col in key_cols]).join(
+            ids, on=key_cols, how="left", nulls_equal=True
+        )
 
 
 class HotspotTransformer:
@@ -163,14 +208,22 @@ class HotspotTransformer:
             self.loader = ClickHouseLoader()
 
         self.id_mappings.loader = self.loader
-        await self.id_mappings.load_existing_locations()
-        await self.id_mappings.load_existing_weather_conditions()
-        await self.id_mappings.load_existing_confidence()
-
         logger.info(f"Starting hotspot transformation for batch: {batch_id}")
 
-        staging_hotspot = await self._read_staging_hotspot(batch_id)
-        staging_weather = await self._read_staging_weather(batch_id)
+        reads = {
+            "staging_hotspot": self._read_staging_hotspot(batch_id),
+            "staging_weather": self._read_staging_weather(batch_id),
+        }
+        if not self.id_mappings.deterministic:
+            reads.update(
+                {
+                    "existing_weather_conditions": self.id_mappings.load_existing_weather_conditions(),
+                    "existing_confidence": self.id_mappings.load_existing_confidence(),
+                }
+            )
+        prefetched = await self._prefetch(reads)
+        staging_hotspot = prefetched["staging_hotspot"]
+        staging_weather = prefetched["staging_weather"]
 
         if staging_hotspot.is_empty():
             logger.warning("No staging hotspot data found")
@@ -179,135 +232,184 @@ class HotspotTransformer:
         logger.info(f"Processing {len(staging_hotspot)} staging hotspot records")
         logger.info(f"Processing {len(staging_weather)} staging weather records")
 
-        dimensional_data = {}
-
-        dimensional_data["dim_period"] = await self._create_dim_period(staging_hotspot)
-
-        dimensional_data["dim_satellite"] = self._create_dim_satellite(staging_hotspot)
+        hotspot_lf = self._parse_staging_hotspot(staging_hotspot.lazy())
+        weather_lf = self._parse_staging_weather(staging_weather.lazy())
 
-        dimensional_data["dim_confidence"] = self._create_dim_confidence(
-            staging_hotspot
+        # Small key sets that ids and locations are resolved from, collected
+        # in one pass over the shared parsed plans
+        unique_coords, unique_dates, confidence_keys, condition_keys = pl.collect_all(
+            [
+                pl.concat(
+                    [
+                        hotspot_lf.select(["latitude", "longitude"]),
+                        weather_lf.select(["latitude", "longitude"]),
+                    ]
+                ).unique(),
+                pl.concat(
+                    [hotspot_lf.select("date_value"), weather_lf.select("date_value")]
+                ).unique(),
+                hotspot_lf.select(["confidence", "instrument"]).unique(),
+                weather_lf.select("conditions").unique(),
+            ]
         )
 
-        dimensional_data["dim_weather_condition"] = self._create_dim_weather_condition(
-            staging_weather
+        resolved = await self._prefetch(
+            {
+                "period_ids": self.id_mappings.resolve_periods(unique_dates),
+                "location_mapping": self._get_location_mapping(unique_coords),
+            }
         )
-
-        dimensional_data["fact_hotspot"] = await self._create_fact_hotspot(
-            staging_hotspot, staging_weather
+        period_ids = resolved["period_ids"]
+        location_mapping = resolved["location_mapping"]
+        confidence_ids = self.id_mappings.resolve("dim_confidence", confidence_keys)
+        condition_ids = self.id_mappings.resolve(
+            "dim_weather_condition", condition_keys
         )
 
-        dimensional_data["fact_weather"] = await self._create_fact_weather(
-            staging_weather
+        plans = {
+            "dim_period": self._create_dim_period(period_ids),
+            "dim_satellite": self._create_dim_satellite(hotspot_lf),
+            "dim_confidence": self._create_dim_confidence(confidence_ids),
+            "dim_weather_condition": self._create_dim_weather_condition(
+                weather_lf, condition_ids
+            ),
+            "fact_hotspot": self._create_fact_hotspot(
+                hotspot_lf, period_ids, confidence_ids, location_mapping
+            ),
+            "fact_weather": self._create_fact_weather(
+                weather_lf, period_ids, condition_ids, location_mapping
+            ),
+        }
+
+        engine = "streaming" if settings.transform_streaming else "auto"
+        dimensional_data = dict(
+            zip(plans, pl.collect_all(list(plans.values()), engine=engine))
         )
 
+        for table_name, staging_df in (
+            ("fact_hotspot", staging_hotspot),
+            ("fact_weather", staging_weather),
+        ):
+            fact_df = dimensional_data[table_name]
+            rejected_count = len(staging_df) - len(fact_df)
+            if rejected_count > 0:
+                logger.warning(
+                    f"Filtered out {rejected_count} {table_name} records with no valid location_id"
+                )
+            if fact_df.is_empty() and not staging_df.is_empty():
+                logger.warning(f"No {table_name} records with valid location_id")
+
+            if "id" not in fact_df.columns:
+                dimensional_data[table_name] = fact_df.insert_column(
+                    0, generate_ulids(len(fact_df))
+                )
+
         logger.info(
             f"Hotspot transformation completed. Created {len(dimensional_data)} tables"
         )
         return dimensional_data
 
-    async def _read_staging_hotspot(self, batch_id: str = None) -> pl.DataFrame:
-        if batch_id:
-            query = f"SELECT * FROM staging_hotspot WHERE batch_id = '{batch_id}'"
-        else:
-            query = """
-            SELECT * FROM staging_hotspot
-            WHERE batch_id = (
-                SELECT batch_id FROM staging_hotspot
-                ORDER BY ingested_at DESC LIMIT 1
-            )
-            """
+    async def _prefetch(self, reads: Dict[str, Awaitable]) -> Dict[str, Any]:
+        # Independent ClickHouse reads run together on the pooled client, so a
+        # stage takes about as long as its slowest query. The cap keeps one
+        # transformation from holding every connection in the pool.
+        semaphore = asyncio.Semaphore(settings.transform_prefetch_concurrency)
+        read_timings: Dict[str, float] = {}
+
+        async def timed_read(name: str, read: Awaitable) -> Any:
+            async with semaphore:
+                started_at = time.perf_counter()
+                try:
+                    return await read
+                finally:
+                    read_timings[name] = round(time.perf_counter() - started_at, 3)
+
+        started_at = time.perf_counter()
+        results = await asyncio.gather(
+            *[timed_read(name, read) for name, read in reads.items()]
+        )
+        logger.info(
+            f"Prefetched {len(reads)} reads in {time.perf_counter() - started_at:.2f}s "
+            f"({settings.transform_prefetch_concurrency} in flight), "
+            f"per read (s): {read_timings}"
+        )
+        return dict(zip(reads, results))
 
-        try:
-            result = await self.loader.execute_query(query + " FORMAT CSVWithNames")
-            if result.strip():
-                lines = result.strip().split("\n")
-                if len(lines) > 1:
-                    csv_data = io.StringIO(result)
-                    return pl.read_csv(
-                        csv_data,
-                        null_values=["\\N"],
-                        schema_overrides={
-                            "confidence": pl.Utf8,
-                            "latitude": pl.Utf8,
-                            "longitude": pl.Utf8,
-                            "frp": pl.Float32,
-                            "brightness": pl.Float32,
-                            "bright_t31": pl.Float32,
-                            "scan": pl.Float32,
-                            "track": pl.Float32,
-                            "bright_ti4": pl.Float32,
-                            "bright_ti5": pl.Float32,
-                        },
-                    )
-            return pl.DataFrame()
-        except Exception as e:
-            logger.error(f"Error reading staging hotspot: {e}")
-            return pl.DataFrame()
+    async def _read_staging_hotspot(self, batch_id: str = None) -> pl.DataFrame:
+        return await self._read_staging_table(
+            "staging_hotspot", STAGING_HOTSPOT_COLUMNS, batch_id
+        )
 
     async def _read_staging_weather(self, batch_id: str = None) -> pl.DataFrame:
+        return await self._read_staging_table(
+            "staging_weather", STAGING_WEATHER_COLUMNS, batch_id
+        )
+
+    async def _read_staging_table(
+        self, table_name: str, columns: List[str], batch_id: str = None
+    ) -> pl.DataFrame:
+        projection = ", ".join(columns)
         if batch_id:
-            query = f"SELECT * FROM staging_weather WHERE batch_id = '{batch_id}'"
+            query = (
+                f"SELECT {projection} FROM {table_name} WHERE batch_id = '{batch_id}'"
+            )
         else:
-            query = """
-            SELECT * FROM staging_weather
+            query = f"""
+            SELECT {projection} FROM {table_name}
             WHERE batch_id = (
-                SELECT batch_id FROM staging_weather
+                SELECT batch_id FROM {table_name}
                 ORDER BY ingested_at DESC LIMIT 1
             )
             """
 
         try:
-            result = await self.loader.execute_query(query + " FORMAT CSVWithNames")
-            if result.strip():
-                lines = result.strip().split("\n")
-                if len(lines) > 1:
-                    csv_data = io.StringIO(result)
-                    return pl.read_csv(
-                        csv_data,
-                        null_values=["\\N"],
-                        schema_overrides={
-                            "latitude": pl.Utf8,
-                            "longitude": pl.Utf8,
-                            "temperature": pl.Int16,
-                            "feels_like": pl.Float32,
-                            "humidity": pl.Float32,
-                            "precipitation": pl.Float32,
-                            "precip_prob": pl.UInt8,
-                            "wind_speed": pl.Float32,
-                            "wind_degree": pl.Float32,
-                            "wind_gust": pl.Float32,
-                            "pressure": pl.UInt16,
-                            "visibility": pl.UInt16,
-                            "cloud_coverage": pl.UInt8,
-                            "solar_radiation": pl.Float32,
-                            "solar_energy": pl.Float32,
-                            "uv_index": pl.UInt8,
-                            "severe_risk": pl.UInt8,
-                        },
-                    )
-            return pl.DataFrame()
+            staging_df = await self.loader.query_arrow(query)
+            if staging_df.width:
+                return staging_df
         except Exception as e:
-            logger.error(f"Error reading staging weather: {e}")
-            return pl.DataFrame()
+            logger.error(f"Error reading {table_name}: {e}")
 
-    async def _create_dim_period(self, staging_hotspot: pl.DataFrame) -> pl.DataFrame:
-        if staging_hotspot.is_empty():
-            return pl.DataFrame()
+        # Typed but empty, so the lazy plans built on it still resolve
+        schema = TABLE_SCHEMAS[table_name]
+        names = [column.split(" AS ")[-1] for column in columns]
+        return pl.DataFrame(schema={name: schema[name] for name in names})
 
-        date_df = staging_hotspot.select(
-            [pl.col("acq_date").cast(pl.Date).alias("date_value")]
-        ).unique()
+    def _parse_staging_hotspot(self, staging_hotspot: pl.LazyFrame) -> pl.LazyFrame:
+        return staging_hotspot.with_columns(
+            [pl.col("acq_time").cast(pl.Utf8).str.zfill(4).alias("time_str")]
+        ).with_columns(
+            [
+                (
+                    pl.col("acq_date").cast(pl.Utf8)
+                    + " "
+                    + pl.col("time_str").str.slice(0, 2)
+                    + ":"
+                    + pl.col("time_str").str.slice(2, 2)
+                    + ":00"
+                )
+                .str.strptime(pl.Datetime, "%Y-%m-%d %H:%M:%S")
+                .alias("acquired_at"),
+                pl.col("acq_date").cast(pl.Utf8).alias("date_value"),
+            ]
+        )
+
+    def _parse_staging_weather(self, staging_weather: pl.LazyFrame) -> pl.LazyFrame:
+        return staging_weather.with_columns(
+            pl.col("datetime")
+            .dt.convert_time_zone("UTC")
+            .dt.replace_time_zone(None)
+            .alias("acquired_at")
+        ).with_columns(
+            pl.col("acquired_at").dt.date().cast(pl.Utf8).alias("date_value")
+        )
 
-        period_ids = []
-        for date_row in date_df.iter_rows(named=True):
-            date_str = str(date_row["date_value"])
-            period_id = await self.id_mappings.get_period_id_for_date(date_str)
-            period_ids.append(period_id)
+    def _create_dim_period(self, period_ids: pl.DataFrame) -> pl.LazyFrame:
+        date_df = period_ids.lazy().with_columns(
+            pl.col("date_value").str.to_date("%Y-%m-%d")
+        )
 
         dim_period = date_df.with_columns(
             [
-                pl.Series("id", period_ids, dtype=pl.Utf8),
                 pl.col("date_value").dt.year().alias("year_value"),
                 pl.when(pl.col("date_value").dt.month() <= 6)
                 .then(pl.lit(1))
@@ -333,11 +435,8 @@ class HotspotTransformer:
 
         return dim_period
 
-    def _create_dim_satellite(self, staging_hotspot: pl.DataFrame) -> pl.DataFrame:
-        if staging_hotspot.is_empty():
-            return pl.DataFrame()
-
-        satellite_df = staging_hotspot.select(
+    def _create_dim_satellite(self, hotspot_lf: pl.LazyFrame) -> pl.LazyFrame:
+        satellite_df = hotspot_lf.select(
             ["satellite", "instrument", "version"]
         ).unique()
 
@@ -378,360 +477,231 @@ class HotspotTransformer:
 
         return dim_satellite
 
-    def _create_dim_confidence(self, staging_hotspot: pl.DataFrame) -> pl.DataFrame:
-        if staging_hotspot.is_empty():
-            return pl.DataFrame()
-
-        confidence_df = staging_hotspot.select(["confidence", "instrument"]).unique()
-
-        dim_confidence = confidence_df.with_columns(
-            [
-                pl.struct(["confidence", "instrument"])
-                .map_elements(
-                    lambda row: self.id_mappings.get_confidence_id(
-                        row["confidence"], row["instrument"]
-                    ),
-                    return_dtype=pl.Utf8,
-                )
-                .alias("id"),
-                pl.col("confidence").alias("confidence_raw"),
-                pl.col("instrument").alias("source_instrument"),
-                pl.when(pl.col("instrument") == "MODIS")
-                .then(
-                    pl.when(pl.col("confidence").cast(pl.Int32, strict=False) >= 80)
-                    .then(pl.lit("HIGH"))
-                    .when(pl.col("confidence").cast(pl.Int32, strict=False) >= 30)
-                    .then(pl.lit("NOMINAL"))
-                    .otherwise(pl.lit("LOW"))
-                )
-                .when(pl.col("instrument") == "VIIRS")
-                .then(
-                    pl.when(pl.col("confidence").is_in(["h", "high"]))
-                    .then(pl.lit("HIGH"))
-                    .when(pl.col("confidence").is_in(["n", "nominal"]))
-                    .then(pl.lit("NOMINAL"))
-                    .otherwise(pl.lit("LOW"))
-                )
-                .otherwise(pl.lit("UNKNOWN"))
-                .alias("confidence_class"),
-                pl.when(pl.col("instrument") == "MODIS")
-                .then(pl.col("confidence").cast(pl.Int32, strict=False))
-                .when(pl.col("instrument") == "VIIRS")
-                .then(
-                    pl.when(pl.col("confidence").is_in(["h", "high"]))
-                    .then(pl.lit(85))
-                    .when(pl.col("confidence").is_in(["n", "nominal"]))
-                    .then(pl.lit(50))
-                    .otherwise(pl.lit(15))
-                )
-                .otherwise(pl.lit(0))
-                .alias("confidence_numeric"),
-                pl.when(pl.col("instrument") == "MODIS")
-                .then(pl.col("confidence").cast(pl.Float32, strict=False) / 100.0)
-                .when(pl.col("instrument") == "VIIRS")
-                .then(
-                    pl.when(pl.col("confidence").is_in(["h", "high"]))
-                    .then(pl.lit(0.85))
-                    .when(pl.col("confidence").is_in(["n", "nominal"]))
-                    .then(pl.lit(0.50))
-                    .otherwise(pl.lit(0.15))
-                )
-                .otherwise(pl.lit(0.0))
-                .alias("confidence_score"),
-                pl.when(pl.col("instrument") == "MODIS")
-                .then(pl.lit("MODIS confidence percentage (0-100)"))
-                .when(pl.col("instrument") == "VIIRS")
-                .then(pl.lit("VIIRS confidence category (low/nominal/high)"))
-                .otherwise(pl.lit("Unknown confidence format"))
-                .alias("description"),
-            ]
-        ).select(
-            [
-                "id",
-                "confidence_raw",
-                "source_instrument",
-                "confidence_class",
-                "confidence_numeric",
-                "confidence_score",
-                "description",
-            ]
+    def _create_dim_confidence(self, confidence_ids: pl.DataFrame) -> pl.LazyFrame:
+        dim_confidence = (
+            confidence_ids.lazy()
+            .with_columns(
+                [
+                    pl.col("confidence").alias("confidence_raw"),
+                    pl.col("instrument").alias("source_instrument"),
+                    pl.when(pl.col("instrument") == "MODIS")
+                    .then(
+                        pl.when(pl.col("confidence").cast(pl.Int32, strict=False) >= 80)
+                        .then(pl.lit("HIGH"))
+                        .when(pl.col("confidence").cast(pl.Int32, strict=False) >= 30)
+                        .then(pl.lit("NOMINAL"))
+                        .otherwise(pl.lit("LOW"))
+                    )
+                    .when(pl.col("instrument") == "VIIRS")
+                    .then(
+                        pl.when(pl.col("confidence").is_in(["h", "high"]))
+                        .then(pl.lit("HIGH"))
+                        .when(pl.col("confidence").is_in(["n", "nominal"]))
+                        .then(pl.lit("NOMINAL"))
+                        .otherwise(pl.lit("LOW"))
+                    )
+                    .otherwise(pl.lit("UNKNOWN"))
+                    .alias("confidence_class"),
+                    pl.when(pl.col("instrument") == "MODIS")
+                    .then(pl.col("confidence").cast(pl.Int32, strict=False))
+                    .when(pl.col("instrument") == "VIIRS")
+                    .then(
+                        pl.when(pl.col("confidence").is_in(["h", "high"]))
+                        .then(pl.lit(85))
+                        .when(pl.col("confidence").is_in(["n", "nominal"]))
+                        .then(pl.lit(50))
+                        .otherwise(pl.lit(15))
+                    )
+                    .otherwise(pl.lit(0))
+                    .alias("confidence_numeric"),
+                    pl.when(pl.col("instrument") == "MODIS")
+                    .then(pl.col("confidence").cast(pl.Float32, strict=False) / 100.0)
+                    .when(pl.col("instrument") == "VIIRS")
+                    .then(
+                        pl.when(pl.col("confidence").is_in(["h", "high"]))
+                        .then(pl.lit(0.85))
+                        .when(pl.col("confidence").is_in(["n", "nominal"]))
+                        .then(pl.lit(0.50))
+                        .otherwise(pl.lit(0.15))
+                    )
+                    .otherwise(pl.lit(0.0))
+                    .alias("confidence_score"),
+                    pl.when(pl.col("instrument") == "MODIS")
+                    .then(pl.lit("MODIS confidence percentage (0-100)"))
+                    .when(pl.col("instrument") == "VIIRS")
+                    .then(pl.lit("VIIRS confidence category (low/nominal/high)"))
+                    .otherwise(pl.lit("Unknown confidence format"))
+                    .alias("description"),
+                ]
+            )
+            .select(
+                [
+                    "id",
+                    "confidence_raw",
+                    "source_instrument",
+                    "confidence_class",
+                    "confidence_numeric",
+                    "confidence_score",
+                    "description",
+                ]
+            )
         )
 
         return dim_confidence
 
     def _create_dim_weather_condition(
-        self, staging_weather: pl.DataFrame
-    ) -> pl.DataFrame:
-        if staging_weather.is_empty():
-            return pl.DataFrame()
-
-        weather_df = staging_weather.select(["conditions", "icon"]).unique()
-
-        dim_weather = weather_df.with_columns(
-            [
-                pl.col("conditions")
-                .map_elements(
-                    lambda x: self.id_mappings.get_weather_condition_id(x),
-                    return_dtype=pl.Utf8,
-                )
-                .alias("id")
-            ]
-        ).select(["id", "conditions", "icon"])
+        self, weather_lf: pl.LazyFrame, condition_ids: pl.DataFrame
+    ) -> pl.LazyFrame:
+        dim_weather = (
+            weather_lf.select(["conditions", "icon"])
+            .unique()
+            .join(condition_ids.lazy(), on="conditions", how="left", nulls_equal=True)
+            .select(["id", "conditions", "icon"])
+        )
 
         return dim_weather
 
-    async def _create_fact_hotspot(
-        self, staging_hotspot: pl.DataFrame, staging_weather: pl.DataFrame
-    ) -> pl.DataFrame:
-        if staging_hotspot.is_empty():
-            return pl.DataFrame()
-
-        fact_df = staging_hotspot.with_columns(
-            [pl.col("acq_time").cast(pl.Utf8).str.zfill(4).alias("time_str")]
-        ).with_columns(
-            [
-                (
-                    pl.col("acq_date").cast(pl.Utf8)
-                    + " "
-                    + pl.col("time_str").str.slice(0, 2)
-                    + ":"
-                    + pl.col("time_str").str.slice(2, 2)
-                    + ":00"
-                )
-                .str.strptime(pl.Datetime, "%Y-%m-%d %H:%M:%S")
-                .dt.replace_time_zone("UTC")
-                .dt.replace_time_zone(None)
-                .alias("acquired_at"),
-                pl.col("acq_date")
-                .cast(pl.Utf8)
-                .map_elements(
-                    lambda x: self.id_mappings.get_time_id(x), return_dtype=pl.Utf8
-                )
-                .alias("period_id"),
-            ]
+    def _with_location_ids(
+        self, fact_lf: pl.LazyFrame, location_mapping: pl.DataFrame
+    ) -> pl.LazyFrame:
+        return (
+            fact_lf.join(
+                location_mapping.lazy(), on=["latitude", "longitude"], how="left"
+            )
+            .with_columns([pl.col("location_id").fill_null("")])
+            .filter(pl.col("location_id") != "")
         )
 
-        unique_coords = fact_df.select(["latitude", "longitude"]).unique()
-        location_mapping = await self._get_location_mapping(unique_coords)
+    def _fact_id_columns(self, table_name: str) -> List[pl.Expr]:
+        if not settings.incremental_ingestion:
+            return []
+        return [
+            deterministic_id_expr(table_name, FACT_NATURAL_KEYS[table_name]).alias("id")
+        ]
+
+    def _create_fact_hotspot(
+        self,
+        hotspot_lf: pl.LazyFrame,
+        period_ids: pl.DataFrame,
+        confidence_ids: pl.DataFrame,
+        location_mapping: pl.DataFrame,
+    ) -> pl.LazyFrame:
+        fact_lf = hotspot_lf.join(
+            period_ids.lazy().rename({"id": "period_id"}), on="date_value", how="left"
+        ).join(
+            confidence_ids.lazy().rename({"id": "confidence_id"}),
+            on=["confidence", "instrument"],
+            how="left",
+            nulls_equal=True,
+        )
 
-        if not location_mapping.is_empty():
-            fact_df = fact_df.join(
-                location_mapping, on=["latitude", "longitude"], how="left"
+        return (
+            self._with_location_ids(fact_lf, location_mapping)
+            .with_columns(
+                [
+                    (pl.col("satellite") + "_" + pl.col("instrument")).alias(
+                        "satellite_id"
+                    ),
+                    pl.col("frp").cast(pl.Float32),
+                    pl.col("brightness").cast(pl.Float32),
+                    pl.col("bright_t31").cast(pl.Float32),
+                    pl.col("bright_ti4").cast(pl.Float32),
+                    pl.col("bright_ti5").cast(pl.Float32),
+                    pl.col("scan").cast(pl.Float32),
+                    pl.col("track").cast(pl.Float32),
+                ]
             )
-        else:
-            fact_df = fact_df.with_columns(pl.lit("").alias("location_id"))
-
-        fact_df = fact_df.with_columns([pl.col("location_id").fill_null("")])
-
-        original_count = len(fact_df)
-        fact_df = fact_df.filter(pl.col("location_id") != "")
-        filtered_count = len(fact_df)
-        rejected_count = original_count - filtered_count
-
-        if rejected_count > 0:
-            logger.warning(
-                f"Filtered out {rejected_count} fact_hotspot records with no valid location_id"
+            .select(
+                self._fact_id_columns("fact_hotspot")
+                + [
+                    "satellite_id",
+                    "confidence_id",
+                    "period_id",
+                    "location_id",
+                    "acquired_at",
+                    "frp",
+                    "brightness",
+                    "bright_t31",
+                    "bright_ti4",
+                    "bright_ti5",
+                    "latitude",
+                    "longitude",
+                    "scan",
+                    "track",
+                ]
             )
-
-        if fact_df.is_empty():
-            logger.warning("No fact_hotspot records with valid location_id")
-            return pl.DataFrame()
-
-        hotspot_ids = [str(ULID()) for _ in range(len(fact_df))]
-
-        fact_hotspot = fact_df.with_columns(
-            [
-                pl.Series("id", hotspot_ids, dtype=pl.Utf8),
-                (pl.col("satellite") + "_" + pl.col("instrument")).alias(
-                    "satellite_id"
-                ),
-                pl.struct(["confidence", "instrument"])
-                .map_elements(
-                    lambda row: self.id_mappings.get_confidence_id(
-                        row["confidence"], row["instrument"]
-                    ),
-                    return_dtype=pl.Utf8,
-                )
-                .alias("confidence_id"),
-                pl.col("frp").cast(pl.Float32),
-                pl.col("brightness").cast(pl.Float32),
-                pl.col("bright_t31").cast(pl.Float32),
-                pl.col("bright_ti4").cast(pl.Float32),
-                pl.col("bright_ti5").cast(pl.Float32),
-                pl.col("scan").cast(pl.Float32),
-                pl.col("track").cast(pl.Float32),
-            ]
-        ).select(
-            [
-                "id",
-                "satellite_id",
-                "confidence_id",
-                "period_id",
-                "location_id",
-                "acquired_at",
-                "frp",
-                "brightness",
-                "bright_t31",
-                "bright_ti4",
-                "bright_ti5",
-                "latitude",
-                "longitude",
-                "scan",
-                "track",
-            ]
         )
 
-        return fact_hotspot
-
-    async def _create_fact_weather(self, staging_weather: pl.DataFrame) -> pl.DataFrame:
-        if staging_weather.is_empty():
-            return pl.DataFrame()
-
-        weather_ids = [str(ULID()) for _ in range(len(staging_weather))]
-
-        unique_coords = staging_weather.select(["latitude", "longitude"]).unique()
-        location_mapping = await self._get_location_mapping(unique_coords)
-
-        fact_temp = staging_weather.with_columns(
-            [
-                pl.Series("id", weather_ids, dtype=pl.Utf8),
-                pl.col("datetime")
-                .str.strptime(pl.Datetime, "%Y-%m-%d %H:%M:%S.%f")
-                .dt.replace_time_zone("UTC")
-                .dt.replace_time_zone(None)
-                .alias("acquired_at"),
-                pl.col("datetime")
-                .str.strptime(pl.Datetime, "%Y-%m-%d %H:%M:%S.%f")
-                .dt.date()
-                .cast(pl.Utf8)
-                .map_elements(
-                    lambda x: self.id_mappings.get_time_id(x), return_dtype=pl.Utf8
-                )
-                .alias("period_id"),
-                pl.col("conditions")
-                .map_elements(
-                    lambda x: self.id_mappings.get_weather_condition_id(x),
-                    return_dtype=pl.Utf8,
-                )
-                .alias("weather_condition_id"),
-                pl.col("temperature").cast(pl.Int16),
-                pl.col("humidity").cast(pl.Float32),
-                pl.col("wind_speed").cast(pl.Float32),
-                pl.col("wind_degree").cast(pl.Float32),
-                pl.col("visibility").cast(pl.UInt16),
-                pl.col("cloud_coverage").cast(pl.UInt8),
-                pl.col("pressure").cast(pl.UInt16),
-                pl.col("uv_index").cast(pl.UInt8),
-                pl.col("precipitation").cast(pl.Float32),
-                pl.col("solar_radiation").cast(pl.Float32),
-            ]
+    def _create_fact_weather(
+        self,
+        weather_lf: pl.LazyFrame,
+        period_ids: pl.DataFrame,
+        condition_ids: pl.DataFrame,
+        location_mapping: pl.DataFrame,
+    ) -> pl.LazyFrame:
+        fact_lf = weather_lf.join(
+            period_ids.lazy().rename({"id": "period_id"}), on="date_value", how="left"
+        ).join(
+            condition_ids.lazy().rename({"id": "weather_condition_id"}),
+            on="conditions",
+            how="left",
+            nulls_equal=True,
         )
 
-        if not location_mapping.is_empty():
-            fact_temp = fact_temp.join(
-                location_mapping, on=["latitude", "longitude"], how="left"
+        return (
+            self._with_location_ids(fact_lf, location_mapping)
+            .with_columns(
+                [
+                    pl.col("temperature").cast(pl.Int16),
+                    pl.col("humidity").cast(pl.Float32),
+                    pl.col("wind_speed").cast(pl.Float32),
+                    pl.col("wind_degree").cast(pl.Float32),
+                    pl.col("visibility").cast(pl.UInt16),
+                    pl.col("cloud_coverage").cast(pl.UInt8),
+                    pl.col("pressure").cast(pl.UInt16),
+                    pl.col("uv_index").cast(pl.UInt8),
+                    pl.col("precipitation").cast(pl.Float32),
+                    pl.col("solar_radiation").cast(pl.Float32),
+                ]
             )
-        else:
-            fact_temp = fact_temp.with_columns(pl.lit("").alias("location_id"))
-
-        fact_temp = fact_temp.with_columns([pl.col("location_id").fill_null("")])
-
-        original_count = len(fact_temp)
-        fact_temp = fact_temp.filter(pl.col("location_id") != "")
-        filtered_count = len(fact_temp)
-        rejected_count = original_count - filtered_count
-
-        if rejected_count > 0:
-            logger.warning(
-                f"Filtered out {rejected_count} fact_weather records with no valid location_id"
+            .select(
+                self._fact_id_columns("fact_weather")
+                + [
+                    "period_id",
+                    "location_id",
+                    "weather_condition_id",
+                    "acquired_at",
+                    "temperature",
+                    "humidity",
+                    "wind_speed",
+                    "wind_degree",
+                    "visibility",
+                    "cloud_coverage",
+                    "latitude",
+                    "longitude",
+                    "pressure",
+                    "uv_index",
+                    "precipitation",
+                    "solar_radiation",
+                ]
             )
-
-        if fact_temp.is_empty():
-            logger.warning("No fact_weather records with valid location_id")
-            return pl.DataFrame()
-
-        fact_temp = fact_temp.select(
-            [
-                "id",
-                "period_id",
-                "location_id",
-                "weather_condition_id",
-                "acquired_at",
-                "temperature",
-                "humidity",
-                "wind_speed",
-                "wind_degree",
-                "visibility",
-                "cloud_coverage",
-                "latitude",
-                "longitude",
-                "pressure",
-                "uv_index",
-                "precipitation",
-                "solar_radiation",
-            ]
         )
 
-        return fact_temp
-
     async def _get_location_mapping(self, coords_df: pl.DataFrame) -> pl.DataFrame:
         if not self.loader or coords_df.is_empty():
-            return pl.DataFrame()
+            return pl.DataFrame(schema=LOCATION_MAPPING_SCHEMA)
 
         try:
-            all_results = []
-            batch_size = 1000
-
-            total_coords = len(coords_df)
-            logger.info(
-                f"Loading location mapping for {total_coords} coordinates in batches of {batch_size}"
-            )
+            location_df = await self.loader.get_location_mapping(coords_df)
 
-            for batch_start in range(0, total_coords, batch_size):
-                batch_end = min(batch_start + batch_size, total_coords)
-                batch_df = coords_df[batch_start:batch_end]
-
-                lat_list = ",".join(
-                    [f"'{row['latitude']}'" for row in batch_df.iter_rows(named=True)]
-                )
-                lon_list = ",".join(
-                    [f"'{row['longitude']}'" for row in batch_df.iter_rows(named=True)]
-                )
-
-                query = f"""
-                SELECT latitude, longitude, id as location_id
-                FROM dim_location
-                WHERE latitude IN ({lat_list})
-                  AND longitude IN ({lon_list})
-                """
-
-                result = await self.loader.execute_query(query + " FORMAT CSVWithNames")
-
-                if result.strip():
-                    lines = result.strip().split("\n")
-                    if len(lines) > 1:
-                        csv_data = io.StringIO(result)
-                        batch_result = pl.read_csv(
-                            csv_data,
-                            schema_overrides={
-                                "latitude": pl.Utf8,
-                                "longitude": pl.Utf8,
-                                "location_id": pl.Utf8,
-                            },
-                        )
-                        all_results.append(batch_result)
-
-            if all_results:
-                location_df = pl.concat(all_results, how="vertical").unique(
-                    subset=["latitude", "longitude"]
-                )
+            if not location_df.is_empty():
                 logger.info(
-                    f"Loaded location mapping for {len(location_df)} coordinates"
+                    f"Loaded location mapping for {len(location_df)}/{len(coords_df)} coordinates"
                 )
                 return location_df
 
             logger.warning("No location mapping found for provided coordinates")
-            return pl.DataFrame()
         except Exception as e:
             logger.warning(f"Could not load location mapping: {e}")
-            return pl.DataFrame()
+
+        return pl.DataFrame(schema=LOCATION_MAPPING_SCHEMA)
@@ -0,0 +1,84 @@
+import json
+from typing import Any, Dict, List, Tuple
+import redis.asyncio as redis
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class BulkCache:
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        name: str,
+        chunk_size: int = 1000,
+        flush_size: int = 50,
+    ):
+        self.redis_client = redis_client
+        self.name = name
+        self.chunk_size = chunk_size
+        self.flush_size = flush_size
+        self.pending: List[Tuple[str, Any, int]] = []
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        found = {}
+        for chunk_start in range(0, len(keys), self.chunk_size):
+            chunk = keys[chunk_start : chunk_start + self.chunk_size]
+            values = await self.redis_client.mget(chunk)
+
+            for key, value in zip(chunk, values):
+                if value is None:
+                    continue
+                try:
+                    found[key] = json.loads(value)
+                except ValueError:
+                    logger.warning(
+                        f"Ignoring undecodable {self.name} cache entry {key}"
+                    )
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set_many(self, entries: List[Tuple[str, Any, int]]):
+        for chunk_start in range(0, len(entries), self.chunk_size):
+            chunk = entries[chunk_start : chunk_start + self.chunk_size]
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, value, ttl_seconds in chunk:
+                pipe.setex(key, ttl_seconds, json.dumps(value))
+            await pipe.execute()
+
+        self.writes += len(entries)
+
+    # Results are buffered and written every flush_size entries, so a run that
+    # dies halfway keeps most of the paid-for API responses it already fetched
+    async def add(self, key: str, value: Any, ttl_seconds: int):
+        self.pending.append((key, value, ttl_seconds))
+        if len(self.pending) >= self.flush_size:
+            await self.flush()
+
+    async def flush(self):
+        entries, self.pending = self.pending, []
+        if not entries:
+            return
+
+        try:
+            await self.set_many(entries)
+        except Exception as e:
+            logger.warning(
+                f"Failed to write {len(entries)} {self.name} cache entries: {e}"
+            )
+
+    def summary(self) -> str:
+        return (
+            f"{self.name} cache: {self.hits} hits, {self.misses} misses, "
+            f"{self.writes} writes, hit ratio {self.hit_ratio:.1%}"
+        )
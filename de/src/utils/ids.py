@@ -0,0 +1,79 @@
+import hashlib
+import os
+import time
+from typing import List, Optional, Union
+import numpy as np
+import polars as pl
+import pyarrow as pa
+from ulid import ULID
+
+KEY_SEPARATOR = "\x1f"
+CROCKFORD_ALPHABET = np.frombuffer(b"0123456789ABCDEFGHJKMNPQRSTVWXYZ", dtype=np.uint8)
+ULID_LENGTH = 26
+
+
+def generate_ulids(count: int, timestamp_ms: Optional[int] = None) -> pl.Series:
+    # Monotonic ULIDs in the sense of the spec: one timestamp for the batch and
+    # a random 80-bit component that is incremented per row. The high word
+    # holds the 48-bit timestamp and 16 random bits, the low word the other 64.
+    if timestamp_ms is None:
+        timestamp_ms = time.time_ns() // 1_000_000
+
+    random_hi = int.from_bytes(os.urandom(2), "big")
+    # Top bit cleared so adding the row index can never overflow the low word
+    random_lo = int.from_bytes(os.urandom(8), "big") >> 1
+
+    high = np.full(count, (timestamp_ms << 16) | random_hi, dtype=np.uint64)
+    low = np.uint64(random_lo) + np.arange(count, dtype=np.uint64)
+
+    chars = np.empty((count, ULID_LENGTH), dtype=np.uint8)
+    for position in range(ULID_LENGTH):
+        shift = 5 * (ULID_LENGTH - 1 - position)
+        if shift >= 64:
+            digits = high >> np.uint64(shift - 64)
+        elif shift == 60:
+            digits = (low >> np.uint64(60)) | (high << np.uint64(4))
+        else:
+            digits = low >> np.uint64(shift)
+        chars[:, position] = CROCKFORD_ALPHABET[
+            (digits & np.uint64(31)).astype(np.intp)
+        ]
+
+    offsets = np.arange(0, (count + 1) * ULID_LENGTH, ULID_LENGTH, dtype=np.int64)
+    ids = pa.Array.from_buffers(
+        pa.large_string(),
+        count,
+        [None, pa.py_buffer(offsets), pa.py_buffer(chars)],
+    )
+    return pl.Series("id", ids, dtype=pl.Utf8)
+
+
+def _key_to_id(key: str) -> str:
+    digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+    return str(ULID.from_bytes(digest))
+
+
+def deterministic_id(namespace: str, *parts) -> str:
+    key = KEY_SEPARATOR.join(
+        [namespace] + ["" if part is None else str(part) for part in parts]
+    )
+    return _key_to_id(key)
+
+
+def _keys_to_ids(keys: pl.Series) -> pl.Series:
+    # Natural keys repeat heavily (a few confidence levels per million rows),
+    # so hash each distinct key once and map the column back in one pass
+    unique_keys = keys.unique()
+    unique_ids = [_key_to_id(key) for key in unique_keys.to_list()]
+    return keys.replace_strict(unique_keys, unique_ids, return_dtype=pl.Utf8)
+
+
+# Row-wise equivalent of deterministic_id(namespace, *row[columns])
+def deterministic_id_expr(
+    namespace: str, columns: List[Union[str, pl.Expr]]
+) -> pl.Expr:
+    parts = [pl.col(col) if isinstance(col, str) else col for col in columns]
+    return pl.concat_str(
+        [pl.lit(namespace)] + [part.cast(pl.Utf8).fill_null("") for part in parts],
+        separator=KEY_SEPARATOR,
+    ).map_batches(_keys_to_ids, return_dtype=pl.Utf8)